@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+'''microbenchmarks of hashing, equality and ordering of Address, Netmask
+and Prefix objects.'''
+
+import random
+import sys
+import timeit
+
+from ipcidrtree import Address, Netmask, Prefix, plen2int
+
+def objects(count, seed=1):
+	rnd = random.Random(seed)
+	addrs = [Address(rnd.getrandbits(32)) for i in range(count)]
+	masks = [Netmask(rnd.randint(0, 32)) for i in range(count)]
+	prefixes = []
+	for i in range(count):
+		plen = rnd.choice([16, 20, 22, 24, 24, 24, 32, 32])
+		prefixes.append(Prefix(rnd.getrandbits(32) & plen2int(plen), Netmask(plen)))
+	return {'Address': addrs, 'Netmask': masks, 'Prefix': prefixes}
+
+def report(name, stmt, count, setup_globals):
+	elapsed = min(timeit.repeat(stmt, number=1, repeat=3, globals=setup_globals))
+	print('  %-24s %12.0f ops/s' % (name, count/elapsed))
+
+def main(count=100000):
+	for (kind, objs) in objects(count).items():
+		pairs = list(zip(objs, objs[1:]+objs[:1]))
+		g = {'objs': objs, 'pairs': pairs}
+		print(kind)
+		report('hash', 'for o in objs: hash(o)', count, g)
+		report('== (same type)', 'for (a,b) in pairs: a==b', count, g)
+		if kind != 'Prefix':
+			report('== int', 'for o in objs: o==12345', count, g)
+		report('<', 'for (a,b) in pairs: a<b', count, g)
+		report('set()', 'set(objs)', count, g)
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
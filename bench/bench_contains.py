@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+'''microbenchmarks of Prefix containment ("x in prefix") for each kind of
+operand, and of building a tree with add(), where it is the innermost
+test.'''
+
+import os
+import random
+import sys
+import time
+import timeit
+
+from ipcidrtree import Address
+from ipcidrtree.iprange import Range
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes, build
+
+def report(name, stmt, count, setup_globals):
+	elapsed = min(timeit.repeat(stmt, number=1, repeat=3, globals=setup_globals))
+	print('  %-10s %12.0f ops/s' % (name, count/elapsed))
+
+def main(count=100000):
+	rnd = random.Random(1)
+	containers = random_prefixes(count)
+	ints = [rnd.getrandbits(32) for i in range(count)]
+	g = {
+		'containers': containers,
+		'Prefix': list(zip(random_prefixes(count, seed=2), containers)),
+		'Address': list(zip([Address(i) for i in ints], containers)),
+		'int': list(zip(ints, containers)),
+		'Range': list(zip([Range(Address(i), Address(min(i+255, 0xffffffff))) for i in ints], containers)),
+		'str': list(zip([str(Address(i)) for i in ints], containers)),
+	}
+	print('x in prefix:')
+	for kind in ('Prefix', 'Address', 'int', 'Range', 'str'):
+		report(kind, 'for (x,p) in %s: x in p' % kind, count, g)
+
+	start = time.perf_counter()
+	build(containers)
+	elapsed = time.perf_counter() - start
+	print('add(): %d prefixes in %.2fs, %.0f prefixes/s' % (count, elapsed, count/elapsed))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
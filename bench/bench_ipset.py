@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+'''time building IPSets from large numbers of prefixes and combining them
+with the set operators.'''
+
+import random
+import sys
+import time
+
+from ipcidrtree import Netmask, Prefix, plen2int
+from ipcidrtree.ipset import IPSet
+
+def random_set(count, seed):
+	rnd = random.Random(seed)
+	rv = IPSet()
+	for i in range(count):
+		plen = rnd.choice([16, 20, 22, 24, 24, 24, 28, 32])
+		rv.add(Prefix(rnd.getrandbits(32) & plen2int(plen), Netmask(plen)))
+	return rv
+
+def timed(name, func):
+	start = time.perf_counter()
+	rv = func()
+	print('%-12s %8.3fs' % (name, time.perf_counter() - start))
+	return rv
+
+def main(count=100000):
+	a = timed('build A', lambda: random_set(count, 1))
+	b = timed('build B', lambda: random_set(count, 2))
+	print('A: %d intervals, %d addresses' % (len(a._firsts), len(a)))
+	print('B: %d intervals, %d addresses' % (len(b._firsts), len(b)))
+	timed('A | B', lambda: a | b)
+	timed('A & B', lambda: a & b)
+	timed('A - B', lambda: a - b)
+	timed('A ^ B', lambda: a ^ b)
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
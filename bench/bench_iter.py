@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+'''time the PrefixNode tree iterators over a routing-table-like tree.'''
+
+import os
+import random
+import sys
+import time
+
+from ipcidrtree import Netmask, Prefix, PrefixNode, plen2int
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes
+
+def deep_prefixes(count, seed=1):
+	'''chains of nested prefixes, /8 through /32 around random addresses.'''
+	rnd = random.Random(seed)
+	rv = []
+	for i in range(count//25):
+		addr = rnd.getrandbits(32)
+		rv.extend(Prefix(addr & plen2int(plen), Netmask(plen)) for plen in range(8, 33))
+	return rv
+
+def main(count=300000):
+	print('routing table:')
+	run(PrefixNode.from_iterable(random_prefixes(count), duplicates=[]))
+	print('deep chains:')
+	run(PrefixNode.from_iterable(deep_prefixes(count), duplicates=[]))
+
+def run(tree):
+	# the top of the tree, as if expanded in a UI
+	expanded = [n.prefix for (n,d) in tree.bfi()][:2000]
+	for name in ('dfi', 'bfi', 'dfi_post', 'dfi_part'):
+		if not hasattr(tree, name):
+			continue
+		if name == 'dfi_part':
+			it = lambda: tree.dfi_part(filter=expanded)
+		else:
+			it = getattr(tree, name)
+		start = time.perf_counter()
+		n = 0
+		for item in it():
+			n += 1
+		elapsed = time.perf_counter() - start
+		print('  %-10s %7d nodes in %.3fs, %10.0f nodes/s' % (name+'()', n, elapsed, n/elapsed))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+'''compare PrefixNode.lpm() and lpm_indexes() against
+PrefixNode.find_loose() for longest prefix match lookups of random
+addresses. lpm_indexes() is vectorized when NumPy is installed.'''
+
+import random
+import sys
+import time
+from array import array
+
+from ipcidrtree import Address, Netmask, Prefix, PrefixNode, DuplicatePrefixError, plen2int
+
+def random_tree(count, seed=1):
+	rnd = random.Random(seed)
+	root = PrefixNode('0.0.0.0/0')
+	for i in range(count):
+		plen = rnd.choice([8, 12, 16, 19, 20, 22, 23, 24, 24, 24, 32])
+		addr = rnd.getrandbits(32) & plen2int(plen)
+		try:
+			root.add(Prefix(Address(addr), Netmask(plen)))
+		except DuplicatePrefixError:
+			pass
+	return root
+
+def rate(func, keys):
+	start = time.perf_counter()
+	for k in keys:
+		func(k)
+	return len(keys) / (time.perf_counter() - start)
+
+def main(prefixes=50000, lookups=200000):
+	root = random_tree(prefixes)
+	rnd = random.Random(2)
+	ints = [rnd.getrandbits(32) for i in range(lookups)]
+	addrs = [Address(i) for i in ints[:lookups//20]]
+
+	root.lpm(0) # build the lookup table outside the timing
+	print('tree of %d prefixes' % prefixes)
+	print('find_loose(Address): %12.0f lookups/s' % rate(root.find_loose, addrs))
+	print('lpm(Address):        %12.0f lookups/s' % rate(root.lpm, addrs))
+	print('lpm(int):            %12.0f lookups/s' % rate(root.lpm, ints))
+
+	buf = array('I', ints)
+	root.lpm_indexes(buf[:1])
+	start = time.perf_counter()
+	root.lpm_indexes(buf)
+	print('lpm_indexes(array):  %12.0f lookups/s' % (lookups / (time.perf_counter() - start)))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+'''report the memory cost of the basic value types and of PrefixNode trees,
+measured with tracemalloc.'''
+
+import sys
+import tracemalloc
+
+from ipcidrtree import Address, Netmask, Prefix, PrefixNode
+from ipcidrtree.iprange import Range
+
+def per_object(make, count):
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	objs = [make(i) for i in range(count)]
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	# don't count the list holding them
+	return (after - before - sys.getsizeof(objs)) / count
+
+def per_tree_node(count):
+	base = int(Address('10.0.0.0'))
+	prefixes = [Prefix(base+i) for i in range(count)]
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	root = PrefixNode('10.0.0.0/8')
+	for p in prefixes:
+		root.add(p)
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return (after - before) / count
+
+def main(count=100000):
+	base = int(Address('10.0.0.0'))
+	print('Address:    %6.0f bytes' % per_object(lambda i: Address(base+i), count))
+	print('Netmask:    %6.0f bytes' % per_object(lambda i: Netmask(i%33), count))
+	print('Prefix:     %6.0f bytes' % per_object(lambda i: Prefix(base+i), count))
+	print('Range:      %6.0f bytes' % per_object(lambda i: Range(Address(base+i), Address(base+i+9)), count))
+	print('tree node:  %6.0f bytes (/32 host under one /8, Prefix excluded)' % per_tree_node(count))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
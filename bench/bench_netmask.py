@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+'''microbenchmarks of Netmask construction, prefix_len() and by_netsize(),
+with the floating point log formula these used to be based on for
+comparison.'''
+
+import math
+import random
+import sys
+import timeit
+
+from ipcidrtree import Netmask, plen2int
+
+def report(name, stmt, count, setup_globals):
+	elapsed = min(timeit.repeat(stmt, number=1, repeat=3, globals=setup_globals))
+	print('  %-36s %12.0f ops/s' % (name, count/elapsed))
+
+def main(count=100000):
+	rnd = random.Random(1)
+	plens = [rnd.randint(0, 32) for i in range(count)]
+	g = {
+		'math': math,
+		'Netmask': Netmask,
+		'plens': plens,
+		'ints': [plen2int(p) for p in plens],
+		'masks': [Netmask(p) for p in plens],
+		'sizes': [2**(32-p) for p in plens],
+	}
+	report('Netmask(plen)', 'for p in plens: Netmask(p)', count, g)
+	report('Netmask(int)', 'for i in ints: Netmask(i)', count, g)
+	report('prefix_len()', 'for m in masks: m.prefix_len()', count, g)
+	report('log formula (old prefix_len())',
+		'for i in ints: 32-int(math.log((~i & 0xffffffff)+1)/math.log(2))', count, g)
+	report('by_netsize()', 'for s in sizes: Netmask.by_netsize(s)', count, g)
+	report('log formula (old by_netsize())',
+		'for s in sizes: Netmask(32-int(math.log(s, 2)))', count, g)
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+'''time parallel.classify() with increasing numbers of worker processes,
+against lpm() in a single process.'''
+
+import os
+import random
+import sys
+import time
+
+from ipcidrtree import PrefixNode
+from ipcidrtree.parallel import classify
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes
+
+def main(count=100000, lookups=2000000):
+	tree = PrefixNode.from_iterable(random_prefixes(count), duplicates=[])
+	rnd = random.Random(2)
+	addrs = [rnd.getrandbits(32) for i in range(lookups)]
+	print('%d CPUs, %d prefixes, %d addresses' % (os.cpu_count(), count, lookups))
+
+	tree.lpm(0)
+	start = time.perf_counter()
+	for a in addrs:
+		tree.lpm(a)
+	print('lpm(), 1 process: %10.0f addresses/s' % (lookups / (time.perf_counter() - start)))
+
+	for workers in (1, 2, 4, 8):
+		start = time.perf_counter()
+		for node in classify(tree, addrs, workers=workers):
+			pass
+		print('classify(), %d workers: %10.0f addresses/s' % (workers, lookups / (time.perf_counter() - start)))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
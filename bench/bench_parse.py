@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+'''time Parser.parse_i() over a mix of plain addresses, CIDR prefixes and
+address/netmask strings, roughly as found in log and config files.'''
+
+import random
+import sys
+import time
+
+from ipcidrtree import Parser, plen2int
+
+def random_strings(count, seed=1):
+	rnd = random.Random(seed)
+	rv = []
+	for i in range(count):
+		addr = rnd.getrandbits(32)
+		kind = rnd.random()
+		if kind < 0.7:
+			rv.append('%d.%d.%d.%d' % (addr>>24, (addr>>16)&255, (addr>>8)&255, addr&255))
+			continue
+		plen = rnd.randint(8, 32)
+		addr &= plen2int(plen)
+		quads = '%d.%d.%d.%d' % (addr>>24, (addr>>16)&255, (addr>>8)&255, addr&255)
+		if kind < 0.9:
+			rv.append('%s/%d' % (quads, plen))
+		else:
+			mask = plen2int(plen)
+			rv.append('%s/%d.%d.%d.%d' % (quads, mask>>24, (mask>>16)&255, (mask>>8)&255, mask&255))
+	return rv
+
+def main(count=200000):
+	strings = random_strings(count)
+	parse_i = Parser().parse_i
+	start = time.perf_counter()
+	for s in strings:
+		parse_i(s)
+	elapsed = time.perf_counter() - start
+	print('parse_i: %10.0f strings/s (70%% addresses, 20%% x/len, 10%% x/mask)' % (count/elapsed))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+'''time pickling and unpickling a PrefixNode tree and report the pickle
+size.'''
+
+import os
+import pickle
+import sys
+import time
+
+from ipcidrtree import PrefixNode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes
+
+def main(count=200000):
+	tree = PrefixNode.from_iterable(random_prefixes(count), duplicates=[])
+
+	start = time.perf_counter()
+	data = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+	print('dumps: %8.3fs, %d bytes' % (time.perf_counter() - start, len(data)))
+
+	start = time.perf_counter()
+	pickle.loads(data)
+	print('loads: %8.3fs' % (time.perf_counter() - start))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+'''time prune()/add() churn and find() on a flat tree (every prefix a
+direct child of the root) and on a routing-table-like tree.'''
+
+import os
+import random
+import sys
+import time
+
+from ipcidrtree import Netmask, Prefix, PrefixNode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes
+
+def flat_prefixes(count, seed=1):
+	'''distinct /24s, none containing another.'''
+	rnd = random.Random(seed)
+	return [Prefix(n << 8, Netmask(24)) for n in rnd.sample(range(1 << 24), count)]
+
+def churn(tree, prefixes, ops, seed=2):
+	'''prune a random prefix and add it back, ops times.'''
+	rnd = random.Random(seed)
+	picks = [rnd.choice(prefixes) for i in range(ops)]
+	start = time.perf_counter()
+	for p in picks:
+		node = tree.prune(p)
+		tree.add(node)
+	return time.perf_counter() - start
+
+def finds(tree, prefixes, ops, seed=3):
+	rnd = random.Random(seed)
+	picks = [rnd.choice(prefixes) for i in range(ops)]
+	start = time.perf_counter()
+	for p in picks:
+		tree.find(p)
+	return time.perf_counter() - start
+
+def main(count=100000, ops=2000):
+	for (name, prefixes) in (('flat', flat_prefixes(count)), ('routing table', random_prefixes(count))):
+		tree = PrefixNode.from_iterable(prefixes, duplicates=[])
+		present = [n.prefix for (n, d) in tree.dfi()][1:]
+		elapsed = churn(tree, present, ops)
+		print('%-14s prune()+add(): %d ops in %.3fs, %9.0f ops/s' % (name, ops, elapsed, ops/elapsed))
+		elapsed = finds(tree, present, ops)
+		print('%-14s find():        %d ops in %.3fs, %9.0f ops/s' % (name, ops, elapsed, ops/elapsed))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
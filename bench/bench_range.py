@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+'''time parsing range strings, one at a time with Range() and in bulk
+with parseRanges() (when available).'''
+
+import random
+import sys
+import time
+
+import ipcidrtree.iprange
+from ipcidrtree.iprange import Range
+
+def random_lines(count, seed=1):
+	rnd = random.Random(seed)
+	rv = []
+	for i in range(count):
+		first = rnd.getrandbits(32) & 0xffffff00
+		quads = lambda a: '%d.%d.%d.%d' % (a>>24, (a>>16)&255, (a>>8)&255, a&255)
+		if i % 2:
+			rv.append('%s-%d\n' % (quads(first), rnd.randint(0, 255)))
+		else:
+			rv.append('%s - %s\n' % (quads(first), quads(min(first + rnd.randint(0, 1<<20), 0xffffffff))))
+	return rv
+
+def main(count=100000):
+	lines = random_lines(count)
+	start = time.perf_counter()
+	for line in lines:
+		Range(line.strip())
+	elapsed = time.perf_counter() - start
+	print('Range(str):    %10.0f ranges/s' % (count/elapsed))
+
+	if hasattr(ipcidrtree.iprange, 'parseRanges'):
+		start = time.perf_counter()
+		for r in ipcidrtree.iprange.parseRanges(lines):
+			pass
+		elapsed = time.perf_counter() - start
+		print('parseRanges(): %10.0f ranges/s' % (count/elapsed))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+'''time sorting a routing-table-like list of Prefixes, by comparison and
+with Prefix.sort_key.'''
+
+import os
+import sys
+import time
+
+from ipcidrtree import Prefix
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes
+
+def main(count=200000):
+	prefixes = random_prefixes(count)
+
+	start = time.perf_counter()
+	sorted(prefixes)
+	elapsed = time.perf_counter() - start
+	print('sorted():                    %d prefixes in %.2fs, %.0f prefixes/s' % (count, elapsed, count/elapsed))
+
+	if hasattr(Prefix, 'sort_key'):
+		prefixes = random_prefixes(count)
+		start = time.perf_counter()
+		sorted(prefixes, key=Prefix.sort_key)
+		elapsed = time.perf_counter() - start
+		print('sorted(key=Prefix.sort_key): %d prefixes in %.2fs, %.0f prefixes/s' % (count, elapsed, count/elapsed))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
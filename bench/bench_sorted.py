@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+'''time building a tree with add() and walking it in order a few times:
+a PrefixNode tree sorted before every walk against an OrderedPrefixNode
+tree, which is kept in order as it is built.'''
+
+import os
+import sys
+import time
+
+from ipcidrtree import PrefixNode, OrderedPrefixNode, DuplicatePrefixError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes
+
+def run(cls, prefixes, walks):
+	start = time.perf_counter()
+	root = cls('0.0.0.0/0')
+	for p in prefixes:
+		try:
+			root.add(p)
+		except DuplicatePrefixError:
+			pass
+	built = time.perf_counter()
+	for i in range(walks):
+		root.sort()
+		for (node, depth) in root.dfi():
+			pass
+	done = time.perf_counter()
+	return (built-start, done-built)
+
+def main(count=100000, walks=5):
+	prefixes = random_prefixes(count)
+	for cls in (PrefixNode, OrderedPrefixNode):
+		(build, walk) = run(cls, prefixes, walks)
+		print('%-17s add(): %.2fs, %d x sort()+dfi(): %.2fs, total %.2fs' % (cls.__name__, build, walks, walk, build+walk))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+'''time building a PrefixNode tree from a routing-table-like mix of prefix
+lengths, by adding prefixes one at a time and with the bulk loader.'''
+
+import random
+import sys
+import time
+
+from ipcidrtree import Address, Netmask, Prefix, PrefixNode, DuplicatePrefixError, plen2int
+
+def random_prefixes(count, seed=1):
+	rnd = random.Random(seed)
+	rv = []
+	for i in range(count):
+		plen = rnd.choice([8, 12, 16, 19, 20, 22, 23, 24, 24, 24, 24, 32])
+		rv.append(Prefix(rnd.getrandbits(32) & plen2int(plen), Netmask(plen)))
+	return rv
+
+def build(prefixes):
+	root = PrefixNode('0.0.0.0/0')
+	for p in prefixes:
+		try:
+			root.add(p)
+		except DuplicatePrefixError:
+			pass
+	return root
+
+def main(count=100000):
+	prefixes = random_prefixes(count)
+	start = time.perf_counter()
+	build(prefixes)
+	elapsed = time.perf_counter() - start
+	print('add():           %d prefixes in %.2fs, %.0f prefixes/s' % (count, elapsed, count/elapsed))
+
+	start = time.perf_counter()
+	PrefixNode.from_iterable(prefixes, duplicates=[])
+	elapsed = time.perf_counter() - start
+	print('from_iterable(): %d prefixes in %.2fs, %.0f prefixes/s' % (count, elapsed, count/elapsed))
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+'''compare rebuilding a tree from prefixes with opening a tree file
+written by treefile.writeTree(), and time lookups in the mapped file.'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from ipcidrtree import PrefixNode
+from ipcidrtree.treefile import writeTree, MappedTree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_tree import random_prefixes
+
+def main(count=200000, lookups=200000):
+	prefixes = random_prefixes(count)
+	start = time.perf_counter()
+	tree = PrefixNode.from_iterable(prefixes, duplicates=[])
+	print('from_iterable():  %8.3fs' % (time.perf_counter() - start))
+
+	(fd, path) = tempfile.mkstemp(suffix='.ipct')
+	os.close(fd)
+	try:
+		start = time.perf_counter()
+		writeTree(tree, path)
+		print('writeTree():      %8.3fs, %d bytes' % (time.perf_counter() - start, os.path.getsize(path)))
+
+		start = time.perf_counter()
+		mt = MappedTree(path)
+		print('MappedTree():     %8.6fs' % (time.perf_counter() - start))
+
+		rnd = random.Random(2)
+		keys = [rnd.getrandbits(32) for i in range(lookups)]
+		start = time.perf_counter()
+		for k in keys:
+			mt.lpm(k)
+		print('MappedTree.lpm(): %8.0f lookups/s' % (lookups / (time.perf_counter() - start)))
+		mt.close()
+	finally:
+		os.unlink(path)
+
+if __name__=='__main__':
+	main(*[int(a) for a in sys.argv[1:]])
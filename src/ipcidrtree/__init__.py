@@ -71,9 +71,10 @@ POSSIBILITY OF SUCH DAMAGE.
 """
 
 import re
-import types
 import sys
-import math
+from bisect import bisect_left, bisect_right
+from array import array
+from collections import OrderedDict, namedtuple
 
 __version__='1.3.1'
 __author__='Steve Benson'
@@ -84,9 +85,31 @@ def plen2int(plen):
 	notation) and returns a 32 bit unsigned integer representing the netmask."""
 	return (2**plen-1) * 2**(32-plen)
 
-def _log2(n):
-	"""Returns the log base 2 of an integer."""
-	return math.log(n)/math.log(2)
+# netmask integers indexed by prefix length
+_plen_masks = [plen2int(i) for i in range(33)]
+
+_numpy=False
+
+def _get_numpy():
+	"""Returns the numpy module, or None if it isn't installed. NumPy is an
+	optional dependency used only for bulk operations."""
+	global _numpy
+	if _numpy is False:
+		try:
+			import numpy as _numpy
+		except ImportError:
+			_numpy=None
+	return _numpy
+
+_Range=None
+
+def _get_range():
+	"""Returns iprange.Range, which can't be imported until this module
+	has been."""
+	global _Range
+	if _Range is None:
+		from ipcidrtree.iprange import Range as _Range
+	return _Range
 
 def _bits32(i):
 	"""Truncates an integer to 32 bits."""
@@ -111,6 +134,17 @@ def parseIntQuads(*quads):
 		addr += oc * pow_of_two[i]
 	return addr
 
+def _quads_to_int(q1,q2,q3,q4,s):
+	
+	'''given four strings of digits that are the octets of the IP number in
+	string s, return the IP number as an integer.'''
+
+	o1=int(q1); o2=int(q2); o3=int(q3); o4=int(q4)
+	if o1>255 or o2>255 or o3>255 or o4>255:
+		i = [o>255 for o in (o1,o2,o3,o4)].index(True)
+		raise ValueError('invalid IP address %s: Invalid IPv4 address - octet %d out of range' % (repr(s), i+1))
+	return (o1<<24)|(o2<<16)|(o3<<8)|o4
+
 def parseStrQuads(s):
 	
 	'''given a string of the form 'x.x.x.x', return it as an IP number integer'''
@@ -139,11 +173,17 @@ def isIntValidNetmask(i):
 
 	'''is the given integer a valid subnet mask?'''
 
-	return i in valid_masks
+	return i in _valid_mask_set
+
+_valid_mask_set = frozenset(valid_masks)
 
 
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'max_len', 'cur_len'])
+
 class Parser:
 	
+	# maximum number of entries in the parse_o() cache. 0 disables the
+	# cache, None leaves it unbounded. See set_cache_size().
 	CACHE_MAX_LEN = 1000
 	
 	"""This is a string parser. It parses address/prefix strings into binary
@@ -157,32 +197,77 @@ class Parser:
 			self.exp_simple=re.compile('^([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})$')
 			self.exp_prefix=re.compile('^([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})/([0-9]{1,2})$')
 			self.exp_net_netmask=re.compile('^([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})/([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})$')
+			# all of the above in one: address octets, then either a mask
+			# length or netmask octets
+			self.exp_any=re.compile('^([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})(?:/(?:([0-9]{1,2})|([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})))?$')
 			#"""
-			self._parse_o_cache = {}
+			# least recently used entries first
+			self._parse_o_cache = OrderedDict()
+			self.cache_hits = 0
+			self.cache_misses = 0
+			self.cache_evictions = 0
 		
 		def flush_cache(self):
-			if len(list(self._parse_o_cache.keys())) > Parser.CACHE_MAX_LEN:
-				while len(list(self._parse_o_cache.keys())) > Parser.CACHE_MAX_LEN:
-					del self._parse_o_cache[list(self._parse_o_cache.keys())[0]]
+			"""Evict least recently used entries until the cache holds at
+			most Parser.CACHE_MAX_LEN of them."""
+			cache = self._parse_o_cache
+			max_len = Parser.CACHE_MAX_LEN
+			if max_len is None:
+				return
+			while len(cache) > max_len:
+				cache.popitem(last=False)
+				self.cache_evictions += 1
+
+		def clear_cache(self):
+			"""Empty the cache and reset its statistics."""
+			self._parse_o_cache.clear()
+			self.cache_hits = 0
+			self.cache_misses = 0
+			self.cache_evictions = 0
+
+		def set_cache_size(self,max_len):
+			"""Change the maximum number of entries in the parse_o() cache
+			(Parser.CACHE_MAX_LEN) at runtime. 0 disables caching and None
+			makes the cache unbounded. Shrinking it evicts the least
+			recently used entries."""
+			if max_len is not None and max_len < 0:
+				raise ValueError('cache size must be None or >= 0, not %d' % max_len)
+			Parser.CACHE_MAX_LEN = max_len
+			self.flush_cache()
+
+		def cache_info(self):
+			"""Returns a CacheInfo tuple of (hits, misses, evictions,
+			max_len, cur_len) for the parse_o() cache."""
+			return CacheInfo(self.cache_hits, self.cache_misses,
+				self.cache_evictions, Parser.CACHE_MAX_LEN, len(self._parse_o_cache))
 		
 		def parse_o(self,s):
 			"""Parse a string in and return a tuple of (Address,Netmask)
 			objects. The Netmask item may be None if the string doesn't seem
-			to contain a netmask."""
-			if s in self._parse_o_cache:
-				return self._parse_o_cache[s]
-			
-			self.flush_cache()
+			to contain a netmask. Results are kept in a least recently used
+			cache of up to Parser.CACHE_MAX_LEN entries, so the same objects
+			may be returned for the same string."""
+			cache = self._parse_o_cache
+			rv = cache.get(s)
+			if rv is not None:
+				cache.move_to_end(s)
+				self.cache_hits += 1
+				return rv
+			self.cache_misses += 1
 			
 			(addr_i,mask_i) = self.parse_i(s)
 			if mask_i is not None:
 				rv = (Address(addr_i), Netmask(mask_i))
-				self._parse_o_cache[s] = rv
-				return rv
 			else:
 				rv = (Address(addr_i), None)
-				self._parse_o_cache[s] = rv
-				return rv
+
+			max_len = Parser.CACHE_MAX_LEN
+			if max_len is None or max_len > 0:
+				cache[s] = rv
+				if max_len is not None and len(cache) > max_len:
+					cache.popitem(last=False)
+					self.cache_evictions += 1
+			return rv
 
 		def parse_i(self,s):
 			
@@ -190,33 +275,25 @@ class Parser:
 			netmask).  The netmask int may be None if the string doesn't
 			seem to contain a netmask."""
 
-			mask=None
+			# one pass over the string for all three accepted forms
+			mg = self.exp_any.match(s)
+			if mg is None:
+				raise ValueError("Unparseable IPv4 object: '%s'"%(str(s)))
+			(a1,a2,a3,a4,plen,m1,m2,m3,m4) = mg.groups()
 
-			mg_s = self.exp_simple.match(s)
-			mg_p = self.exp_prefix.match(s)
-			mg_m = self.exp_net_netmask.match(s)
-			
-			if mg_s: # this is a plain address
-				mg=mg_s
-			elif mg_p: # this is an addr with a mask len (x.x.x.x/y)
-				mg=mg_p
-				plen = int(mg.group(2))
-				if plen < 0 or plen>32:
+			mask=None
+			if plen is not None: # this is an addr with a mask len (x.x.x.x/y)
+				plen = int(plen)
+				if plen>32:
 					# ParseError
 					raise ValueError('Invalid value %d for prefix len (out of range)' % plen)
-				# convert prefix len to a mask
-				mask=(2**plen-1) * 2**(32-plen)
-			elif mg_m: # addr with full mask (x.x.x.x/y.y.y.y)
-				mg = mg_m
-				mask = parseStrQuads(mg.group(2))
-				if not isIntValidNetmask(mask):
+				mask=_plen_masks[plen]
+			elif m1 is not None: # addr with full mask (x.x.x.x/y.y.y.y)
+				mask = _quads_to_int(m1,m2,m3,m4,s)
+				if not mask in _valid_mask_set:
 					raise ValueError('Invalid netmask')
-				
-			else:
-				raise ValueError("Unparseable IPv4 object: '%s'"%(str(s)))
 
-			# now, parse the address itself
-			addr = parseStrQuads(mg.group(1))
+			addr = _quads_to_int(a1,a2,a3,a4,s)
 
 			return (addr,mask)
 	
@@ -241,6 +318,8 @@ class IPNumber:
 	"""This class is basically just a 32 bit unsigned integer as used in
 	IPv4 addresses."""
 
+	__slots__ = ('_ip_int',)
+
 	def __init__(self,val):
 
 		"""The address argument can be a string (which will be parsed to an
@@ -274,9 +353,14 @@ class IPNumber:
 		if not (ipnum>=0 and ipnum<=2**32-1):
 			raise ValueError('Invalid integer IPv4 number: %d (out of range)' % ipnum)
 		self._ip_int = ipnum
+
+	def __reduce__(self):
+		# __slots__ alone can't be pickled at protocols 0 and 1
+		return (self.__class__, (self._ip_int,), getattr(self,'__dict__',None))
 		
-	def __hash__(self): # TODO
-		return hash(str(self))
+	def __hash__(self):
+		# consistent with __eq__ against other IPNumbers and ints
+		return hash(self._ip_int)
 		
 	def __str__(self):
 		oc1 = (self._ip_int&4278190080)/16777216
@@ -292,8 +376,15 @@ class IPNumber:
 		return self._ip_int
 
 	def __eq__(self,other):
+		if isinstance(other, IPNumber):
+			return self._ip_int == other._ip_int
+		if type(other)==int:
+			return self._ip_int == other
 		try:
 			return self._ip_int == IPNumber(other)._ip_int
+		except TypeError:
+			# e.g. a Prefix, which knows how to compare itself to us
+			return NotImplemented
 		except ValueError as ve:
 			return False
 
@@ -325,25 +416,40 @@ class IPNumber:
 		return self+(-oi) # rely on __add__
 
 	def __lt__(self,other):
-		return int(self) < int(other)
+		if isinstance(other, IPNumber):
+			return self._ip_int < other._ip_int
+		return self._ip_int < int(other)
 	
 	def __le__(self,other):
-		return int(self) <= int(other)
+		if isinstance(other, IPNumber):
+			return self._ip_int <= other._ip_int
+		return self._ip_int <= int(other)
 	
 	def __ne__(self,other):
-		return int(self) != int(other)
+		if isinstance(other, IPNumber):
+			return self._ip_int != other._ip_int
+		rv = self.__eq__(other)
+		if rv is NotImplemented:
+			return rv
+		return not rv
 	
 	def __gt__(self,other):
-		return int(self) > int(other)
+		if isinstance(other, IPNumber):
+			return self._ip_int > other._ip_int
+		return self._ip_int > int(other)
 	
 	def __ge__(self,other):
-		return int(self) >= int(other)
+		if isinstance(other, IPNumber):
+			return self._ip_int >= other._ip_int
+		return self._ip_int >= int(other)
 		
 
 class Netmask(IPNumber):
 	"""This class represents an IPv4 network mask. It is mainly meant to
 	be used as a primitive type used within the Prefix class."""
 	
+	__slots__ = ('_plen', '_netsize', '_hostmask')
+
 	_valid_masks= [4294967295, 4294967294, 4294967292, 4294967288, 4294967280, 4294967264, 4294967232, 4294967168, 4294967040, 4294966784, 4294966272, 4294965248, 4294963200, 4294959104, 4294950912, 4294934528, 4294901760, 4294836224, 4294705152, 4294443008, 4293918720, 4292870144, 4290772992, 4286578688, 4278190080, 4261412864, 4227858432, 4160749568, 4026531840, 3758096384, 3221225472, 2147483648, 0]
 
 	sizes_to_prefix_lens = {
@@ -353,30 +459,74 @@ class Netmask(IPNumber):
 		8: 29,
 	}
 
-	def __init__(self,val):
-		if val.__class__ == self.__class__:
-			IPNumber.__init__(self,val)
+	def __new__(cls,val):
+
+		"""There are only 33 possible netmasks, so Netmask objects are
+		immutable and shared: Netmask(24), Netmask('255.255.255.0') and
+		Netmask(Netmask(24)) all return the same instance. val can be a
+		prefix length (an int in 0..32), a netmask integer, a dotted quad
+		string or another IPNumber."""
+
+		if type(val)==int and 0<=val<=32:
+			mask_i=_plen_masks[val]
+		elif isinstance(val, IPNumber):
+			mask_i=val._ip_int
+		elif type(val)==bytes or type(val)==str:
+			(mask_i,extra)=Parser().parse_i(val)
+			if extra is not None:
+				raise ValueError('string argument "%s" to Netmask constructor contains a netmask.' % val)
+		elif type(val)==int:
+			mask_i=val
 		else:
-			if (type(val)==int or type(val)==int) and 0<=val<=32:
-				val=plen2int(val)
-			IPNumber.__init__(self,val)
-
-	def _set_int(self,mask_i):
-		if type(mask_i) not in [int, int]:
-			raise TypeError('Invalid type for integer netmask')
-		if mask_i not in Netmask._valid_masks:
+			raise TypeError('Cannot convert from %s to Netmask' % type(val))
+
+		try:
+			nm=_netmasks_by_int[mask_i]
+		except KeyError:
 			raise ValueError('Integer %d is not a valid netmask' % mask_i)
-		self._ip_int=mask_i
-		
-	# TODO: make this faster... 
-	# check for the common /32 by comparing to a constant
+		if cls is Netmask:
+			return nm
+		# subclasses get instances of their own
+		return cls._build(nm._plen)
+
+	def __init__(self,val):
+		"""Everything is done by __new__()."""
+		pass
+
+	@classmethod
+	def _build(cls,plen):
+		nm=object.__new__(cls)
+		init=object.__setattr__
+		init(nm, '_ip_int', _plen_masks[plen])
+		init(nm, '_plen', plen)
+		init(nm, '_netsize', 2**(32-plen))
+		init(nm, '_hostmask', 2**(32-plen)-1)
+		return nm
+
+	def __setattr__(self,attr,value):
+		raise AttributeError('Netmask objects are immutable')
+
+	def __reduce__(self):
+		return (self.__class__, (self._plen,))
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self,memo):
+		return self
+
 	def prefix_len(self):
 		"""Returns this Netmask expressed in CIDR "slash" notation."""
-		return 32-int(_log2( _bits32(~self._ip_int)+1) )
+		return self._plen
 
 	def netsize(self):
 		"""Returns the number of addresses that a network with this Netmask would have."""
-		return 2**(32-self.prefix_len())
+		return self._netsize
+
+	def hostmask(self):
+		"""Returns the host bits of this Netmask (its inverse) as an
+		integer, e.g. 255 for a /24."""
+		return self._hostmask
 	
 	@classmethod
 	def by_netsize(cls, netsize):
@@ -387,22 +537,32 @@ class Netmask(IPNumber):
 		
 		if netsize<0 or netsize>2**32:
 			raise ValueError('netsize is out of range')
-		exp = math.log(netsize, 2)
-		if exp!=int(exp):
+		if type(netsize)!=int:
+			if netsize!=int(netsize):
+				raise ValueError('netsize is not a power of two')
+			netsize=int(netsize)
+		# exact for any size, unlike a floating point log
+		if netsize==0 or netsize & (netsize-1):
 			raise ValueError('netsize is not a power of two')
-		plen = 32-int(exp)
-		return cls(plen)
+		return cls(33-netsize.bit_length())
+
+_netmasks_by_plen = [Netmask._build(plen) for plen in range(33)]
+_netmasks_by_int = dict( (nm._ip_int, nm) for nm in _netmasks_by_plen )
 
 class Address(IPNumber):
 	"""
 	This class represents a simple IPv4 IP address. It is mainly meant to
 	be used as a primitive type used within the Prefix class.
 	"""
-	pass
+	__slots__ = ()
 		
 
 class Prefix:
+
+	__slots__ = ('addr', 'netmask', '_key')
+
 	def __init__(self,address,netmask=None):
+		self._key=None
 		self.netmask=None
 		if type(address)==str:
 			(self.addr, self.netmask) = Parser().parse_o(address)
@@ -413,16 +573,20 @@ class Prefix:
 			self.addr=Address(address)
 
 		if netmask is not None:
-			self.netmask=netmask
+			self.netmask=Netmask(netmask)
 		elif netmask is None and self.netmask is None:
 			self.netmask=Netmask(32)
 		
-		if int(self.addr) & _bits32(~int(self.netmask)) != 0: # .15
+		if int(self.addr) & self.netmask._hostmask != 0: # .15
 			if netmask:
 				raise ValueError("network bits overflow prefix length in %s/%s" % (address,netmask))
 			else:
 				raise ValueError("network bits overflow prefix length in prefix '%s'" % address)
 
+	def __reduce__(self):
+		# __slots__ alone can't be pickled at protocols 0 and 1
+		return (self.__class__, (self.addr, self.netmask), getattr(self,'__dict__',None))
+
 	def address(self):
 		"""returns the Address of this Prefix. A Prefix is the combination of
 		a suitable Address and Netmask."""
@@ -431,7 +595,7 @@ class Prefix:
 	def addrs(self):
 		"""Returns an Iterator over all addresses covered by this Prefix. Yields
 		new Prefix objects with /32 netmasks."""
-		return self.subnet( Netmask('255.255.255.255') )
+		return self.subnet( Netmask(32) )
 
 	def network(self):
 		"""Returns the network address within this Prefix. Return value is a
@@ -467,10 +631,13 @@ class Prefix:
 		
 		keepmask = _bits32(~int(new_prefix.netmask))
 		keepbits = int(self.addr) & keepmask
-		self.addr._set_int(int(new_prefix.addr) | keepbits)
+		# a new Address rather than changing ours in place, since ours
+		# may be shared with the Parser cache or other Prefixes
+		self.addr = Address(int(new_prefix.addr) | keepbits)
+		self._key = None
 	
 	def __eq__(self,other):
-		if other==None:
+		if other is None:
 			return False
 			
 		#if not type(other)==types.InstanceType:
@@ -487,50 +654,49 @@ class Prefix:
 		else: # its an Address
 			return self.addr==other
 
+	def sort_key(self):
+		"""Returns an integer which sorts Prefixes in the order __cmp__()
+		describes: the broadcast address shifted left 6 bits, plus 32 minus
+		the prefix length. A Prefix sorts after all of the Prefixes it
+		contains, and before any Prefix starting after it. Use it as
+		sorted(prefixes, key=Prefix.sort_key)."""
+		k=self._key
+		if k is None:
+			nm=self.netmask
+			k=((self.addr._ip_int | nm._hostmask) << 6) | (32-nm._plen)
+			self._key=k
+		return k
+
 	def __cmp__(self,other):
 		"""Usually used to sort Prefixes. When used for sorting, this will cause
 		Prefixes to be sorted by numeric order of their Addresses. Prefixes
 		that contain one another will first be sorted by most specific-ness
 		(ie, longest mask len) first and the Address numeric value second. If
 		each Prefix has an equal mask len, then sort by Address's sort
-		methods."""
-		if self in other or other in self:
-			if self.netmask.prefix_len() == other.netmask.prefix_len():
-				if self.addr < other.addr:
-					return -1
-				elif self.addr > other.addr:
-					return 1
-				else:
-					return 0
-			elif self.netmask.prefix_len() > other.netmask.prefix_len():
-				return -1
-			else:
-				return 1
-		else:
-			if self.addr < other.addr:
-				return -1
-			elif self.addr > other.addr:
-				return 1
-			else:
-				return 0
+		methods. See sort_key()."""
+		a=self.sort_key()
+		b=other.sort_key()
+		return (a>b)-(a<b)
 
 	def __lt__(self,other):
-		"""Usually used to sort Prefixes. When used for sorting, this will cause
-		Prefixes to be sorted by numeric order of their Addresses. Prefixes
-		that contain one another will first be sorted by most specific-ness
-		(ie, longest mask len) first and the Address numeric value second. If
-		each Prefix has an equal mask len, then sort by Address's sort
-		methods."""
-		if self in other or other in self:
-			if self.netmask.prefix_len() == other.netmask.prefix_len():
-				return self.addr < other.addr
-			elif self.netmask.prefix_len() > other.netmask.prefix_len():
-				return True
-			else:
-				return False
-		else:
-			return self.addr < other.addr
-			
+		if not isinstance(other, Prefix):
+			return NotImplemented
+		return self.sort_key() < other.sort_key()
+
+	def __le__(self,other):
+		if not isinstance(other, Prefix):
+			return NotImplemented
+		return self.sort_key() <= other.sort_key()
+
+	def __gt__(self,other):
+		if not isinstance(other, Prefix):
+			return NotImplemented
+		return self.sort_key() > other.sort_key()
+
+	def __ge__(self,other):
+		if not isinstance(other, Prefix):
+			return NotImplemented
+		return self.sort_key() >= other.sort_key()
 	
 	def __str__(self):
 		return '%s/%d' % (str(self.addr),self.netmask.prefix_len())
@@ -544,32 +710,30 @@ class Prefix:
 	def __iter__(self):
 		return self.addrs()
 
-	# TODO: this is way too slow in the non-/32 cases
 	def __hash__(self):
-		if int(self.netmask) == 4294967295:
-			return hash( int(self.addr) )
-		else:
-			return hash(str(self))
+		# a Prefix compares equal to its Address whatever its length, so
+		# it hashes like it: on the address integer alone. at most 33
+		# Prefixes share an address, and so a hash.
+		return hash(self.addr._ip_int)
 
 	def __contains__(self,other):
-		from ipcidrtree.iprange import Range
-		if issubclass(other.__class__, Range):
-			return (
-				other.first() >= self.network().address() and
-				other.last() <= self.broadcast().address()
-			)
-			
-		if other.__class__ != self.__class__:
-			other=Prefix(other)
-		
-		if other.netmask.prefix_len() <= self.netmask.prefix_len():
-			return False
-		
-		other_remasked = int(self.netmask) & int(other.addr)
-		if other_remasked==int(self.addr):
-			return True
-		else:
-			return False
+		"""True if other lies within this Prefix. other can be a Prefix
+		(which must be more specific than this one), an Address or integer
+		(taken as a /32), a Range (which may cover all of this Prefix) or a
+		string Prefix() accepts. Done on the integers alone."""
+		nm=self.netmask
+		if isinstance(other, Prefix):
+			return other.netmask._plen>nm._plen and (other.addr._ip_int & nm._ip_int)==self.addr._ip_int
+		if isinstance(other, IPNumber):
+			return nm._plen<32 and (other._ip_int & nm._ip_int)==self.addr._ip_int
+		if type(other)==int:
+			if not 0<=other<=4294967295:
+				raise ValueError('Invalid integer IPv4 number: %d (out of range)' % other)
+			return nm._plen<32 and (other & nm._ip_int)==self.addr._ip_int
+		if isinstance(other, _get_range()):
+			first=self.addr._ip_int
+			return other._first._ip_int>=first and other._last._ip_int<=first|nm._hostmask
+		return Prefix(other) in self
 
 	def contains(self,other):
 		return other in self
@@ -696,11 +860,122 @@ class Prefix:
 
 
 class DuplicatePrefixError(Exception):
-	def __init__(self,prefix):
+	def __init__(self,prefix,prefixes=None):
 		self.prefix=prefix
+		# every duplicate, when several were found at once (see
+		# PrefixNode.from_iterable())
+		if prefixes is None:
+			prefixes=[prefix]
+		self.prefixes=prefixes
 	def __str__(self):
+		if len(self.prefixes)>1:
+			return 'duplicate prefixes: '+', '.join(str(p) for p in self.prefixes)
 		return 'duplicate prefix: '+str(self.prefix)
 
+class _TrieNode(object):
+
+	"""A node in the path-compressed binary trie which indexes the children
+	of a PrefixNode by address bits. Nodes with a value are leaves holding
+	one child PrefixNode and have no branch list; nodes without a value
+	only exist to branch and always have both branches set."""
+
+	__slots__ = ('key', 'plen', 'branch', 'value')
+
+	def __init__(self, key, plen, value=None):
+		self.key = key
+		self.plen = plen
+		if value is None:
+			self.branch = [None, None]
+		else:
+			self.branch = None
+		self.value = value
+
+def _trie_values(trie):
+	"""Yields the values stored in the trie rooted at trie in address
+	order."""
+	stack = [trie]
+	while stack:
+		n = stack.pop()
+		if n is None:
+			continue
+		if n.value is not None:
+			yield n.value
+		else:
+			stack.append(n.branch[1])
+			stack.append(n.branch[0])
+
+def _read_prefixes(lines):
+	"""Yields a Prefix for each non-blank, non-comment line in lines."""
+	parse_i=Parser().parse_i
+	for (n,line) in enumerate(lines):
+		line=line.strip()
+		if not line or line[0]=='#':
+			continue
+		try:
+			(addr,mask)=parse_i(line)
+			if mask is None:
+				yield Prefix(addr)
+			else:
+				yield Prefix(addr,Netmask(mask))
+		except ValueError as ve:
+			raise ValueError('line %d: %s' % (n+1, ve))
+
+def _prefix_keys(prefixes):
+	"""Returns a set of (address, prefix length) integer pairs for an
+	iterable of Prefix objects, PrefixNodes or prefix strings."""
+	keys=set()
+	for p in prefixes:
+		if isinstance(p, PrefixNode):
+			p=p.prefix
+		elif not isinstance(p, Prefix):
+			p=Prefix(p)
+		keys.add((p.addr._ip_int, p.netmask._plen))
+	return keys
+
+def _check_int_range(lowest,highest):
+	"""Raise ValueError unless lowest and highest, the extremes of some
+	integer addresses, are both in 0..2**32-1."""
+	if lowest<0:
+		raise ValueError('Invalid integer IPv4 number: %d (out of range)' % lowest)
+	if highest>4294967295:
+		raise ValueError('Invalid integer IPv4 number: %d (out of range)' % highest)
+
+def _node_addr(node):
+	return node.prefix.addr._ip_int
+
+def _trie_build(nodes):
+
+	"""Build the trie for a list of disjoint PrefixNodes which is sorted by
+	address, in one pass: the branch node between neighbours sits at their
+	common prefix length, so the trie is assembled along its right edge
+	like a Cartesian tree. Returns the root of the trie."""
+
+	root = None
+	spine = [] # branch nodes on the path to the rightmost leaf
+	for node in nodes:
+		a = node.prefix.addr._ip_int
+		l = node.prefix.netmask._plen
+		leaf = _TrieNode(a, l, node)
+		if root is None:
+			root = leaf
+		else:
+			c = min(32 - (a ^ prev_a).bit_length(), l, prev_l)
+			left = prev_leaf
+			while spine and spine[-1].plen > c:
+				left = spine.pop()
+			glue = _TrieNode(a & _plen_masks[c], c)
+			glue.branch[0] = left
+			glue.branch[1] = leaf
+			if spine:
+				spine[-1].branch[1] = glue
+			else:
+				root = glue
+			spine.append(glue)
+		prev_a = a
+		prev_l = l
+		prev_leaf = leaf
+	return root
+
 class PrefixNode(object):
 	
 	"""This class represents a node in a tree of IP Prefix objects. The tree
@@ -708,15 +983,17 @@ class PrefixNode(object):
 	10.1.2.3/32). Every PrefixNode represents one Prefix and can contain
 	zero or more PrefixNodes as children."""
 
+	__slots__ = ('prefix', 'children', '_children_hash', '_trie', '_pos', '_version', '_lpm_table', '__weakref__')
+
 	def __init__(self,prefix):
 
 		"""Returns a new PrefoxNode. The 'prefix' argument can be anything suitable as the argument to Prefix.__init__()."""
 
-		if type(prefix)==types.InstanceType and issubclass(prefix.__class__,Prefix):
+		if isinstance(prefix, Prefix):
 			self.prefix=prefix
-		elif type(prefix)==types.InstanceType and issubclass(prefix.__class__,Address):
+		elif isinstance(prefix, Address):
 			self.prefix = Prefix(prefix)
-		elif type(prefix)==bytes:
+		elif type(prefix)==str:
 			self.prefix=Prefix(prefix)
 		else:
 			raise TypeError('PrefixNode constructor requires Prefix or string argument - got a %s' % type(prefix))
@@ -728,14 +1005,27 @@ class PrefixNode(object):
 		# the child's Prefix
 		self._children_hash={}
 		
-		# a subset of our list of children, only the ones that are possible
-		# parents
-		self._children_pospars=[]
+		# the same children again, indexed by address bits in a
+		# path-compressed binary trie (see _TrieNode)
+		self._trie=None
+
+		# our place in the parent's children list: these numbers increase
+		# along the list, so a child can be found in it by bisection
+		self._pos=None
+
+		# a one item list counting changes to the shape of the tree. all
+		# nodes of a tree share it (see _join()); lpm() compares it to the
+		# count its lookup table was built at.
+		self._version=[0]
+
+		# flattened lookup table built by lpm()
+		self._lpm_table=None
 
 	def _rrenumber(self,new_prefix):
 		self.prefix.renumber(new_prefix)
 		for c in self.children:
-			c.rrenumber(new_prefix)
+			c._rrenumber(new_prefix)
+		self._reindex()
 	
 	def renumber(self,old_prefix,new_prefix):
 		"""Renumber a child node with prefix old_prefix and its children to
@@ -762,24 +1052,211 @@ class PrefixNode(object):
 			raise DuplicatePrefixError(dpe.prefix)
 		
 	def sort(self):
-		"""Sorts this tree in-place. Uses Prefix's __cmp__() for sorting."""
-		self.children.sort()
-		for child in self.children:
+		"""Sorts this tree in-place, in the order of Prefix's __cmp__():
+		siblings never overlap, so that is simply address order."""
+		self.children.sort(key=_node_addr)
+		for (i,child) in enumerate(self.children):
+			child._pos=i
 			child.sort()
 
+	def _join(self,child):
+		"""Count a change to this tree, and make the tree rooted at child
+		(about to be added to this one) share this tree's change counter.
+		Subtrees which were pruned from this tree share it already."""
+		version=self._version
+		version[0]+=1
+		if child._version is version:
+			return
+		if not child.children:
+			child._version=version
+			child._lpm_table=None
+			return
+		for (node,depth) in child.dfi():
+			node._version=version
+			node._lpm_table=None
+
 	def _add_child(self,child):
-		self.children.append(child)
+		self._join(child)
+		children=self.children
+		if children:
+			child._pos=children[-1]._pos+1
+		else:
+			child._pos=0
+		children.append(child)
 		self._children_hash[child.prefix]=child
-		if child.prefix.netmask.prefix_len()<32:
-			self._children_pospars.append(child)
 	
 	def _rm_child(self,child):
-		self.children.remove(child)
+		self._trie_remove(int(child.prefix.addr), child.prefix.netmask.prefix_len())
+		self._unlist_child(child)
+
+	def _rm_children(self,children):
+		"""Remove several children at once, leaving the trie alone. Used
+		when a new child adopts part of the trie."""
+		if not children:
+			return
+		self._version[0]+=1
+		gone=set(id(c) for c in children)
+		# one pass over the list, keeping the rest in the order they
+		# were added
+		self.children[:]=[c for c in self.children if id(c) not in gone]
+		for child in children:
+			del(self._children_hash[child.prefix])
+
+	def _unlist_child(self,child):
+		# children stay in the order they were added. they are in order
+		# of _pos too, so the child is found by bisection rather than by
+		# searching the list.
+		self._version[0]+=1
+		children=self.children
+		pos=child._pos
+		lo=0
+		hi=len(children)
+		while lo<hi:
+			mid=(lo+hi)//2
+			if children[mid]._pos<pos:
+				lo=mid+1
+			else:
+				hi=mid
+		del(children[lo])
 		del(self._children_hash[child.prefix])
-		if child in self._children_pospars:
-			self._children_pospars.remove(child)
 
-	# TODO: this method is slow as ass, see note in body
+	def _reindex(self):
+		"""Rebuild the trie and hash indexes of children from the children
+		list, e.g. after their prefixes were changed in place."""
+		self._version[0]+=1
+		self._children_hash={}
+		self._trie=None
+		for (i,c) in enumerate(self.children):
+			c._pos=i
+			self._children_hash[c.prefix]=c
+			self._trie_insert(int(c.prefix.addr), c.prefix.netmask.prefix_len(), c)
+
+	def _trie_find(self,a,l):
+		"""Return the child whose prefix contains or equals the prefix with
+		integer address a and length l, or None."""
+		n = self._trie
+		while n is not None:
+			p = n.plen
+			if p > l or (a & _plen_masks[p]) != n.key:
+				return None
+			if n.value is not None:
+				return n.value
+			n = n.branch[(a >> (31-p)) & 1]
+		return None
+
+	def _trie_insert(self,a,l,value):
+
+		"""Insert value into the trie under the prefix with integer address
+		a and length l. No child may contain or equal that prefix (see
+		_trie_find). Returns the detached sub-trie holding all children
+		which fall within the new prefix, or None if there are none."""
+
+		leaf = _TrieNode(a, l, value)
+		parent = None
+		side = 0
+		n = self._trie
+		# descend through branch nodes above the new prefix
+		while n is not None:
+			p = n.plen
+			if p < l and (a & _plen_masks[p]) == n.key:
+				parent = n
+				side = (a >> (31-p)) & 1
+				n = parent.branch[side]
+			else:
+				break
+
+		adopted = None
+		if n is None:
+			pass
+		elif n.plen >= l and (n.key & _plen_masks[l]) == a:
+			# everything from n down falls within the new prefix
+			adopted = n
+		else:
+			# diverges from n; branch at their longest common prefix
+			c = min(32 - (a ^ n.key).bit_length(), l, n.plen)
+			glue = _TrieNode(a & _plen_masks[c], c)
+			b = (a >> (31-c)) & 1
+			glue.branch[b] = leaf
+			glue.branch[1-b] = n
+			leaf = glue
+
+		if parent is None:
+			self._trie = leaf
+		else:
+			parent.branch[side] = leaf
+		return adopted
+
+	def _trie_within(self,a,l):
+		"""Return the sub-trie holding all children which fall within the
+		prefix with integer address a and length l, or None, without
+		changing anything. These are the children _trie_insert() would hand
+		back."""
+		n = self._trie
+		while n is not None:
+			p = n.plen
+			if p < l and (a & _plen_masks[p]) == n.key:
+				n = n.branch[(a >> (31-p)) & 1]
+			else:
+				break
+		if n is not None and n.plen >= l and (n.key & _plen_masks[l]) == a:
+			return n
+		return None
+
+	def _accepts(self,child):
+		"""Can the PrefixNode child be put below this node? Any can be;
+		see PPrefixNode."""
+		return True
+
+	def _check_child(self,child):
+		"""Raise TypeError unless child can be put below this node."""
+		if not self._accepts(child):
+			raise TypeError("a %s can't be added below a %s" % (child.__class__.__name__, self.__class__.__name__))
+
+	def _check_merge(self,others):
+		"""Raise DuplicatePrefixError if any node in the trees rooted at the
+		PrefixNodes in others has the same prefix as a node in the tree
+		rooted here, or TypeError if merging the two could put a node below
+		one which doesn't accept it."""
+		mine=[n for (n,depth) in self.dfi()]
+		keys=_prefix_keys(mine)
+		theirs=[]
+		for other in others:
+			for (n,depth) in other.dfi():
+				if (n.prefix.addr._ip_int, n.prefix.netmask._plen) in keys:
+					raise DuplicatePrefixError(n.prefix)
+				theirs.append(n)
+		# any of these nodes may end up below any other. what a node
+		# accepts is up to its class, so one of each class will do.
+		parents=dict( (n.__class__, n) for n in mine+theirs )
+		for parent in parents.values():
+			for child in mine[1:]+theirs:
+				parent._check_child(child)
+
+	def _trie_remove(self,a,l):
+		"""Remove the child with integer address a and prefix length l from
+		the trie, collapsing the branch node above it."""
+		grandparent = None
+		gside = 0
+		parent = None
+		side = 0
+		n = self._trie
+		while n is not None and n.value is None:
+			grandparent, gside = parent, side
+			parent = n
+			side = (a >> (31-n.plen)) & 1
+			n = n.branch[side]
+		if n is None or n.key != a or n.plen != l:
+			raise KeyError('prefix not indexed in trie')
+
+		if parent is None:
+			self._trie = None
+			return
+		sibling = parent.branch[1-side]
+		if grandparent is None:
+			self._trie = sibling
+		else:
+			grandparent.branch[gside] = sibling
+
 	def add(self,new_child):
 		"""Add a new PrefixNode to this tree. This will automatically add
 		the new child to the correct place in the tree (as long as it is
@@ -790,150 +1267,446 @@ class PrefixNode(object):
 		if self.prefix.netmask.prefix_len()==32:
 			return False
 			
-		if not issubclass(new_child.__class__, PrefixNode):
-			new_child=PrefixNode(new_child)
+		if not isinstance(new_child, PrefixNode):
+			new_child=self.__class__(new_child)
 
 		# if I don't contain it, False
 		if not new_child.prefix in self.prefix:
 			return False
 		
-		# judging by time analysis, the slowness is in one of the next two
-		# loops... (runtime grows exponentially with number of children)
-		
-		# see if any of my children contain it
-		#  if one of them does, 
-		# see if any of our children would like it first
-		# this is too slow...
-		#for node in self.children:
-		for node in self._children_pospars:
-			if node.add(new_child):
-				return True
-
-		# next, see if it would like to adpot one of our children 
-		# and be our child
-		if self.parenting(new_child):
-			raise DuplicatePrefixError(new_child.prefix)
-
-		# TODO: any better way to optimize this?
-		if new_child.prefix.netmask.prefix_len()<32:
-			for cur_child in self.children:
-				if new_child.add(cur_child):
-				
-					self._add_child(new_child)
-					self._rm_child(cur_child)
-					
-					return True
-	
-		# no children took it, but I contain it... 
-		# so it must be my direct decendant
-		self._add_child(new_child)
+		a = int(new_child.prefix.addr)
+		l = new_child.prefix.netmask.prefix_len()
+
+		# walk down to the most specific node containing it. each step
+		# costs at most one trie walk over the bits of the new prefix.
+		node = self
+		while True:
+			child = node._trie_find(a, l)
+			if child is None:
+				break
+			if child.prefix.netmask.prefix_len()==l:
+				raise DuplicatePrefixError(new_child.prefix)
+			node = child
+
+		# it becomes a child of node and adopts whichever of node's
+		# children it contains. if it has children of its own, the adopted
+		# ones are merged in with them. check nothing of this can fail
+		# before changing anything, so an error leaves the tree as it was.
+		node._check_child(new_child)
+		within = node._trie_within(a, l)
+		if within is not None:
+			adopted = list(_trie_values(within))
+			if new_child.children:
+				new_child._check_merge(adopted)
+			else:
+				for c in adopted:
+					new_child._check_child(c)
+
+		# the trie hands the adopted children back as one sub-trie
+		adopted_trie = node._trie_insert(a, l, new_child)
+		if adopted_trie is not None:
+			node._rm_children(adopted)
+		node._add_child(new_child)
+		if adopted_trie is not None:
+			if new_child.children:
+				for c in adopted:
+					new_child.add(c)
+			else:
+				new_child._trie = adopted_trie
+				for c in adopted:
+					new_child._add_child(c)
+
 		return True
 
-	# TODO: this is WAY slow
+	@classmethod
+	def from_iterable(cls,prefixes,root='0.0.0.0/0',duplicates=None):
+
+		"""Build and return a new tree rooted at root from an iterable of
+		prefixes (Prefix objects or strings). This is much faster than
+		calling add() for each one: the prefixes are sorted by address and
+		prefix length, after which every prefix's parent is on a stack of
+		the prefixes containing the previous one, so the whole tree is
+		built in one pass.
+
+		Duplicate prefixes (including the root itself) are reported all
+		at once: if duplicates is a list, each one is appended to it and
+		otherwise skipped. Without a list, a single DuplicatePrefixError
+		is raised once all prefixes have been read, with every duplicate
+		in its prefixes attribute. A prefix which is outside of root raises
+		ValueError."""
+
+		root=cls(root)
+		items=[]
+		keys=[]
+		for p in prefixes:
+			if not isinstance(p, Prefix):
+				p=Prefix(p)
+			items.append(p)
+			keys.append( (int(p.addr) << 6) | p.netmask._plen )
+		order=sorted(range(len(items)), key=keys.__getitem__)
+		if duplicates is None:
+			found=[]
+			root._build_sorted( ((keys[i],items[i]) for i in order), found )
+			if found:
+				raise DuplicatePrefixError(found[0], found)
+		else:
+			root._build_sorted( ((keys[i],items[i]) for i in order), duplicates )
+		return root
+
+	def _build_sorted(self,entries,duplicates=None):
+
+		"""Add descendants to this childless node from entries, an iterable
+		of (key, Prefix) pairs sorted by key, which is (address << 6) |
+		prefix length. The Prefix may be None, in which case one is made
+		from the key. Returns the list of new nodes in the order they were
+		created. See from_iterable()."""
+
+		cls=self.__class__
+		root_first=int(self.prefix.addr)
+		root_last=root_first+len(self.prefix)-1
+		root_plen=self.prefix.netmask._plen
+
+		created=[]
+		# (node, last address) for the chain of nodes containing the
+		# previous prefix
+		stack=[(self,root_last)]
+		prev_key=None
+		for (key,p) in entries:
+			a=key >> 6
+			l=key & 63
+			if p is None:
+				p=Prefix(a,_netmasks_by_plen[l])
+			last=a+(1 << (32-l))-1
+			if key==prev_key or (a==root_first and l==root_plen):
+				if duplicates is not None:
+					duplicates.append(p)
+				continue
+			if a<root_first or last>root_last or l<root_plen:
+				raise ValueError("prefix %s is not within the root %s" % (p, self.prefix))
+			prev_key=key
+
+			while stack[-1][1]<a:
+				done=stack.pop()[0]
+				if done.children:
+					done._trie=_trie_build(done.children)
+			parent=stack[-1][0]
+			node=cls(p)
+			parent._add_child(node)
+			created.append(node)
+			if l<32:
+				stack.append( (node,last) )
+
+		# children were added in address order, so each node's trie can
+		# be built in one go once all of its children are known
+		for (node,last) in stack:
+			if node.children:
+				node._trie=_trie_build(node.children)
+		return created
+
+	def __reduce__(self):
+
+		"""Pickle support. The tree rooted here is stored flat: the address
+		and prefix length of every descendant in sorted order, packed into
+		byte strings, plus any per-node __dict__ of subclasses. Unpickling
+		rebuilds the tree and its indexes in one pass (as from_iterable()
+		does), so deep trees don't hit the recursion limit. The parent of
+		the pickled node itself is not kept."""
+
+		addrs=array('I')
+		plens=array('B')
+		nodes=[]
+		stack=[_trie_values(self._trie)]
+		# depth-first with children in address order gives the nodes sorted
+		# by (address, prefix length)
+		while stack:
+			node=next(stack[-1],None)
+			if node is None:
+				stack.pop()
+				continue
+			nodes.append(node)
+			addrs.append(node.prefix.addr._ip_int)
+			plens.append(node.prefix.netmask._plen)
+			stack.append(_trie_values(node._trie))
+
+		states=None
+		if any(getattr(n,'__dict__',None) for n in [self]+nodes):
+			states=[getattr(n,'__dict__',None) for n in [self]+nodes]
+		if sys.byteorder!='little':
+			addrs.byteswap()
+		return (_unpickle_tree, (self.__class__, self.prefix, addrs.tobytes(), plens.tobytes(), states))
+
+	@classmethod
+	def load_file(cls,f,root='0.0.0.0/0',duplicates=None):
+
+		"""Build and return a new tree from a file of prefixes, one per
+		line, in any form Prefix() accepts. f can be a filename or an open
+		file. Blank lines and lines starting with '#' are ignored. See
+		from_iterable() for root and duplicates."""
+
+		if isinstance(f, str):
+			with open(f) as fh:
+				return cls.from_iterable(_read_prefixes(fh),root,duplicates)
+		return cls.from_iterable(_read_prefixes(f),root,duplicates)
+
 	def parenting(self,new_child):
 		"""Return true/false if we are parenting a PrefixNode with an equivalent
 		Prefix to new_child."""
-		if new_child.prefix in self._children_hash:
-			return True
-		return False
-		
-		for c in self.children:
-			if c.prefix==new_child.prefix:
-				return True
-		return False
+		return new_child.prefix in self._children_hash
+
+	def _descend(self,key):
+
+		"""Walk down the child tries towards the Prefix key. Returns
+		(parent, node): node is the PrefixNode equal to key or None, and
+		parent the most specific PrefixNode containing key (None if this
+		one doesn't)."""
+
+		a=key.addr._ip_int
+		l=key.netmask._plen
+		if self.prefix==key:
+			return (None,self)
+		# asked for a prefix that isn't me and can't be 
+		# any of my children
+		p=self.prefix.netmask._plen
+		if p>=l or (a & _plen_masks[p])!=self.prefix.addr._ip_int:
+			return (None,None)
+		parent=self
+		while True:
+			c=parent._trie_find(a,l)
+			if c is None:
+				return (parent,None)
+			if c.prefix.netmask._plen==l:
+				return (parent,c)
+			parent=c
 
 	def prune(self,key):
 		"""Search for a PrefixNode that matches key (a Prefix), remove it
 		from the tree and return it."""
 
-		if not (type(key)==types.InstanceType and issubclass(key.__class__,Prefix)):
+		if not isinstance(key, Prefix):
 			key=Prefix(key)
 
+		(parent,node)=self._descend(key)
 		# if this is the case, then they're asking us to prune the
 		# root of the tree... throw an exception?
-		if self.prefix==key:
-			#return self
+		if node is self:
 			raise ValueError("can't prune root of tree")
-
-		# asked for a prefix that isn't me and can't be 
-		# any of my children
-		if not key in self.prefix:
-			return None
-		
-		for c in self.children:
-			if c.prefix==key:
-				self._rm_child(c)
-				return c
-			else:
-				rv=c.prune(key)
-				if rv is not None:
-					return rv
-
-		return None
+		if node is not None:
+			parent._rm_child(node)
+		return node
 	
 	def dfi(self,depth=0):
 		"""Performs depth-first iteration over the tree rooted at this
 		PrefixNode. Yields (PrefixNode, depth) tuples. depth is an int
 		representing how deep in the tree Prefix is. 0=the root."""
 		yield (self,depth)
-		for c in self.children:
-			for (n,d) in c.dfi(depth+1):
-				yield (n,d)
+		# a stack of iterators over the children still to visit at each
+		# level, so deep trees don't nest generators
+		stack = [iter(self.children)]
+		while stack:
+			for c in stack[-1]:
+				yield (c,depth+len(stack))
+				if c.children:
+					stack.append(iter(c.children))
+				break
+			else:
+				stack.pop()
 
-	def dfi_part(self,depth=0,filter=[]):
+	def dfi_part(self,depth=0,filter=()):
 		"""Performs a partial depth first iteration (like dfi()). This will
-		 only descend through prefixes in the list 'filter'. Yields
+		 only descend through prefixes in the container 'filter' (of
+		 Prefix objects, PrefixNodes or prefix strings). Yields
 		 (PrefixNode, depth, in_filter) tuples. PrefixNode and depth have
 		 the same meaning as in dfi(). in_filter is a boolean and will be
-		 True if PrefixNode is in the passed filter list."""
-		yield (self,depth, self.prefix in filter)
-		if self.prefix in filter:
-			for c in self.children:
-				for (node,cdepth,infilter) in c.dfi_part(depth=depth+1, filter=filter):
-					yield (node,cdepth,infilter)
+		 True if PrefixNode is in the passed filter."""
+		keys=_prefix_keys(filter)
+		return self.dfi_where(
+			lambda n: (n.prefix.addr._ip_int, n.prefix.netmask._plen) in keys,
+			depth)
+
+	def dfi_where(self,predicate,depth=0):
+		"""Like dfi_part(), but descends through the PrefixNodes for which
+		predicate(PrefixNode) is true. Yields (PrefixNode, depth, result)
+		tuples, result being the predicate's verdict on PrefixNode."""
+		result = bool(predicate(self))
+		yield (self,depth,result)
+		if not result:
+			return
+		stack = [iter(self.children)]
+		while stack:
+			for c in stack[-1]:
+				result = bool(predicate(c))
+				yield (c,depth+len(stack),result)
+				if result and c.children:
+					stack.append(iter(c.children))
+				break
+			else:
+				stack.pop()
+
+	def dfi_post(self,depth=0):
+		"""Like dfi(), but yields each PrefixNode after all of its
+		children (post-order), e.g. to aggregate upwards or to remove
+		nodes as they are visited."""
+		# iterate over copies of the children lists, so that removing a
+		# node as it is visited doesn't make its siblings be skipped
+		stack = [(self,iter(list(self.children)))]
+		while stack:
+			(node,it) = stack[-1]
+			for c in it:
+				stack.append((c,iter(list(c.children))))
+				break
+			else:
+				stack.pop()
+				yield (node,depth+len(stack))
+
+	def bfi(self,depth=0):
+		"""Performs breadth-first iteration over the tree rooted at this
+		PrefixNode: the root, then all nodes one level down, and so on.
+		Yields (PrefixNode, depth) tuples as dfi() does."""
+		level = [self]
+		while level:
+			following = []
+			for node in level:
+				yield (node,depth)
+				if node.children:
+					following.extend(node.children)
+			level = following
+			depth += 1
 
 	def find(self,key):
 		"""Searches for the Prefix 'key' within the tree rooted at this
 		PrefixNode. Returns an exactly matching PrefixNode or None."""
-		if not (type(key)==types.InstanceType and issubclass(key.__class__,Prefix)):
+		if not isinstance(key, Prefix):
 			key=Prefix(key)
-
-		if self.prefix==key:
-			return self
-
-		# asked for a prefix that isn't me and can't be 
-		# any of my children
-		if not key in self.prefix:
-			return None
-		
-		for c in self.children:
-			r=c.find(key)
-			if r:
-				return r
-		
-		return None
+		return self._descend(key)[1]
 
 	def find_loose(self,key):
 		"""Searches for the Prefix 'key' within the tree rooted at this
 		PrefixNode. Returns the closest matching PrefixNode or None (if no
 		PrefixNodes contain the search key)."""
-		if not (type(key)==types.InstanceType and issubclass(key.__class__,Prefix)):
+		if not isinstance(key, Prefix):
 			key=Prefix(key)
-
-		# exact match
-		if self.prefix==key:
-			return self
-
-		# I don't even contain it
-		if not key in self.prefix:
-			return None
-		
-		for c in self.children:
-			r=c.find_loose(key)
-			if r:
-				return r
-		
-		return self
+		(parent,node)=self._descend(key)
+		if node is not None:
+			return node
+		return parent
+
+	def lpm(self,key):
+
+		"""Longest prefix match. Returns the most specific PrefixNode in the
+		tree rooted at this PrefixNode which contains the address key, or
+		None. This gives the same answer as find_loose() for an address,
+		but is meant for classifying large numbers of addresses: key may be
+		a plain integer (0 <= key < 2**32), which is looked up without
+		creating any objects, or anything acceptable to Address().
+
+		The first call after the tree changes flattens it into a table of
+		address intervals; lookups are then a binary search of that
+		table."""
+
+		if type(key)!=int:
+			key=int(Address(key))
+		elif not 0<=key<=4294967295:
+			raise ValueError('Invalid integer IPv4 number: %d (out of range)' % key)
+		table=self._lpm_table
+		if table is None or table[0]!=self._version[0]:
+			table=self._lpm_table=self._lpm_build()
+		return table[2][bisect_right(table[1],key)-1]
+
+	def lpm_nodes(self):
+		"""Returns a list of all PrefixNodes in this tree, depth-first with
+		siblings in address order. The results of lpm_indexes() are indexes
+		into this list."""
+		table=self._lpm_table
+		if table is None or table[0]!=self._version[0]:
+			table=self._lpm_table=self._lpm_build()
+		return table[4]
+
+	def lpm_indexes(self,addrs):
+
+		"""Longest prefix match for many addresses at once. addrs is a
+		sequence of integer addresses, such as a NumPy uint32 array or an
+		array('I'). Returns an array holding, for each address, the index
+		into lpm_nodes() of the most specific node containing it, or -1 if
+		no node does.
+
+		If NumPy is installed the lookups are vectorized (one searchsorted
+		over the flattened interval table) and a NumPy int64 array is
+		returned. Otherwise each address is bisected in turn and an
+		array('l') is returned. Raises ValueError, as lpm() does, if any
+		address is out of range."""
+
+		table=self._lpm_table
+		if table is None or table[0]!=self._version[0]:
+			table=self._lpm_table=self._lpm_build()
+
+		numpy=_get_numpy()
+		if numpy is None:
+			if len(addrs):
+				_check_int_range(min(addrs),max(addrs))
+			starts=table[1]
+			numbers=table[3]
+			return array('l', [numbers[bisect_right(starts,a)-1] for a in addrs])
+
+		if table[5] is None:
+			table[5]=(
+				numpy.array(table[1], dtype=numpy.uint32),
+				numpy.array(table[3], dtype=numpy.int64)
+			)
+		(starts,numbers)=table[5]
+		addrs=numpy.asarray(addrs)
+		if addrs.size:
+			_check_int_range(int(addrs.min()),int(addrs.max()))
+		return numbers[numpy.searchsorted(starts,addrs,side='right')-1]
+
+	def _lpm_build(self):
+
+		"""Flatten this tree into sorted, non-overlapping address intervals.
+		Returns [version, starts, nodes, numbers, all_nodes, None] where
+		nodes[i] is the most specific PrefixNode covering addresses
+		starts[i] through starts[i+1]-1 (or None if no node covers them),
+		numbers[i] is the index of nodes[i] in all_nodes (or -1) and the
+		final slot is where lpm_indexes() keeps its NumPy arrays."""
+
+		starts=[]
+		nodes=[]
+		numbers=[]
+		all_nodes=[]
+
+		def emit(start,node,number):
+			if starts and starts[-1]==start:
+				# a more specific node begins at the same address
+				nodes[-1]=node
+				numbers[-1]=number
+			elif not nodes or nodes[-1] is not node:
+				starts.append(start)
+				nodes.append(node)
+				numbers.append(number)
+
+		def descend(node):
+			first=int(node.prefix.addr)
+			number=len(all_nodes)
+			all_nodes.append(node)
+			emit(first,node,number)
+			stack.append( (node, number, _trie_values(node._trie), first+len(node.prefix)-1) )
+
+		if int(self.prefix.addr)>0:
+			emit(0,None,-1)
+		stack=[]
+		descend(self)
+		while stack:
+			(node,number,children,last)=stack[-1]
+			child=next(children,None)
+			if child is not None:
+				descend(child)
+				continue
+			stack.pop()
+			if stack:
+				if last<stack[-1][3]:
+					emit(last+1,stack[-1][0],stack[-1][1])
+			elif last<4294967295:
+				emit(last+1,None,-1)
+
+		return [self._version[0], starts, nodes, numbers, all_nodes, None]
 
 	def __str__(self):
 		return str(self.prefix)
@@ -951,18 +1724,39 @@ class PrefixNode(object):
 			#print '    '*depth,node.prefix
 			print('    '*depth,str(node))
 
+def _unpickle_tree(cls,prefix,addrs,plens,states):
+	"""Rebuilds a tree pickled by PrefixNode.__reduce__()."""
+	a=array('I')
+	a.frombytes(addrs)
+	if sys.byteorder!='little':
+		a.byteswap()
+	root=cls(prefix)
+	nodes=root._build_sorted( ((addr << 6) | plen, None) for (addr,plen) in zip(a,plens) )
+	if states is not None:
+		for (node,state) in zip([root]+nodes,states):
+			if state:
+				node.__dict__.update(state)
+	return root
+
 class PPrefixNode(PrefixNode): 
 
 	"""a PrefixNode which maintains a (circular) reference to its parent. 
 	This means the parent of any given node in a tree can be easily found,
 	but a circular reference is created necessitating manual tree
 	destruction via the unlink() call. The parent reference gets set when
-	add() is called."""
+	add() is called. Nodes added below a PPrefixNode must be able to hold
+	one: add() raises TypeError for a plain PrefixNode."""
+
+	__slots__ = ('parent',)
 	
 	def __init__(self, prefix):
 		super(PPrefixNode,self).__init__(prefix)
 		self.parent=None
 	
+	def _accepts(self, child):
+		# the child needs somewhere to keep its parent reference
+		return isinstance(child, PPrefixNode) or hasattr(child, '__dict__')
+
 	def _add_child(self, child):
 		child.parent=self
 		PrefixNode._add_child(self,child)
@@ -973,6 +1767,59 @@ class PPrefixNode(PrefixNode):
 		for (child,depth) in self.dfi():
 			child.parent=None
 
+class OrderedPrefixNode(PrefixNode):
+
+	"""a PrefixNode which keeps its children sorted by address as they are
+	added and removed, so dfi(), dump() and friends always visit the tree
+	in order and sort() has nothing to do. Nodes created by add() are
+	OrderedPrefixNodes too; PrefixNodes of other classes added to the tree
+	keep their own children in whatever order they have."""
+
+	__slots__ = ('_keys',)
+
+	def __init__(self, prefix):
+		super(OrderedPrefixNode,self).__init__(prefix)
+		# the children's integer addresses, in the same order as children.
+		# siblings never share an address.
+		self._keys=[]
+
+	def sort(self):
+		"""Does nothing: the tree is always sorted."""
+		pass
+
+	def _add_child(self, child):
+		self._join(child)
+		a=child.prefix.addr._ip_int
+		i=bisect_left(self._keys,a)
+		self._keys.insert(i,a)
+		self.children.insert(i,child)
+		self._children_hash[child.prefix]=child
+
+	def _unlist_child(self, child):
+		self._version[0]+=1
+		i=bisect_left(self._keys,child.prefix.addr._ip_int)
+		del(self._keys[i])
+		del(self.children[i])
+		del(self._children_hash[child.prefix])
+
+	def _rm_children(self, children):
+		# the children adopted by a new child are consecutive and in
+		# address order, so they go in one slice
+		if not children:
+			return
+		self._version[0]+=1
+		i=bisect_left(self._keys,children[0].prefix.addr._ip_int)
+		j=i+len(children)
+		del(self._keys[i:j])
+		del(self.children[i:j])
+		for child in children:
+			del(self._children_hash[child.prefix])
+
+	def _reindex(self):
+		self.children.sort(key=_node_addr)
+		self._keys=[c.prefix.addr._ip_int for c in self.children]
+		PrefixNode._reindex(self)
+
 #############################################################
 
 def isValidRange(s):
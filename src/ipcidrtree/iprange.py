@@ -1,24 +1,32 @@
 
 import re
+from collections.abc import Sequence
 
-from ipcidrtree import Address, Prefix
+from ipcidrtree import Address, Netmask, Prefix, Parser
 
 class Range:
+
+	__slots__ = ('_first', '_last')
+
 	def __init__(self, a, b=None):
 
 		'''can either take one string OR two Address objects (first and last
 		in the range)'''
 
 		if type(a)==str and b==None:
-			r = parseRange(a)
-			self._first = r[0]
-			self._last = r[-1]
+			(first, last) = parseRangeBounds(a)
+			self._first = Address(first)
+			self._last = Address(last)
 		elif issubclass(a.__class__, Address) and issubclass(b.__class__, Address):
 			self._first = a
 			self._last = b
 		else:
 			raise TypeError("%s constructor requires either a string or two Address objects" % self.__class__.__name__)
 
+	def __reduce__(self):
+		# __slots__ alone can't be pickled at protocols 0 and 1
+		return (self.__class__, (self._first, self._last), getattr(self,'__dict__',None))
+
 	#first = property( fget = lambda self: self._first )
 	#last = property( fget = lambda self: self._last )
 
@@ -28,15 +36,38 @@ class Range:
 	def last(self):
 		return self._last
 
+	def to_prefixes(self):
+		'''return the smallest list of Prefix objects which together cover
+		exactly the addresses in this Range, in address order.'''
+		ints = self._ints()
+		return summarizeRange(ints.start, ints.stop-1)
+
+	def _ints(self):
+		'''the integer addresses in this Range, as a range object.'''
+		return _int_range(int(self._first), int(self._last))
+
+	def addrs(self, step=1):
+		'''return a lazy sequence of the Address objects in this Range,
+		optionally only every step'th one.'''
+		return AddressSequence(self._ints()[::step])
+
 	def __len__(self):
-		count=0
-		for i in self:
-			count += 1
-		return count
+		return len(self._ints())
 
 	def __iter__(self):
-		for a in expandRange(self._first, self._last):
-			yield a
+		for i in self._ints():
+			yield Address(i)
+
+	def __getitem__(self, key): # implements range[i] and range[i:j]
+		if type(key)==int:
+			try:
+				return Address(self._ints()[key])
+			except IndexError:
+				raise IndexError('Range index out of range')
+		elif type(key)==slice:
+			return AddressSequence(self._ints()[key])
+		else:
+			raise TypeError('Range indicies must be integers or slices')
 		
 	def __contains__(self, o):
 		if issubclass(o.__class__, Prefix):
@@ -87,6 +118,44 @@ def probableRange(s):
 		bool(re_range_complete.match(s))
 	)
 
+# either of the above, with the end as group 2 (complete) or 3 (simple)
+re_range_any = re.compile('^([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}) *- *(?:([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})|([0-9]{1,3}))$')
+
+def parseRangeBounds(s):
+
+	'''given a string of any valid sort of address range, return the first
+	and last addresses in it as a tuple of integers, without looking at
+	the addresses in between.'''
+
+	mg = re_range_any.match(s)
+	if not mg:
+		raise ValueError('unparseable range')
+	parse_i = Parser().parse_i
+	first = parse_i(mg.group(1))[0]
+	if mg.group(2) is not None:
+		last = parse_i(mg.group(2))[0]
+	else:
+		end_s = '.'.join(mg.group(1).split('.')[0:-1]) + '.' + mg.group(3)
+		last = parse_i(end_s)[0]
+	# as in expandRange(), an end before the start yields just the end
+	if last < first:
+		first = last
+	return (first, last)
+
+def parseRanges(lines):
+
+	'''given an iterable of range strings, such as the lines of a file,
+	yield a Range for each. Surrounding whitespace, blank lines and lines
+	starting with '#' are skipped. Raises ValueError for any other
+	unparseable line.'''
+
+	for line in lines:
+		line = line.strip()
+		if not line or line[0]=='#':
+			continue
+		(first, last) = parseRangeBounds(line)
+		yield Range(Address(first), Address(last))
+
 def parseRange(s):
 
 	'''given a string of any valid sort of address range, return all
@@ -128,15 +197,95 @@ def parseRangeSimple(s):
 def expandRange(start, end):
 
 	'''given a start and end address (strings or Address objects), return
-	them and all addresses in between.'''
-
-	start = Address(start)
-	end = Address(end)
-	r = []
-	for i in range(int(start),int(end)):
-		#p = Prefix(Address(i))
-		p = Address(i)
-		r.append(p)
-	r.append(Address(end))
-	
-	return r
+	them and all addresses in between as a lazy AddressSequence.'''
+
+	return AddressSequence(_int_range(int(Address(start)), int(Address(end))))
+
+def _int_range(first, last):
+	# as always, an end before the start yields just the end
+	if last < first:
+		first = last
+	return range(first, last+1)
+
+class AddressSequence(Sequence):
+
+	'''an immutable sequence of Address objects over a Python range of
+	integer addresses. It behaves like the list of Addresses it stands for
+	(len(), indexing, slicing, iteration, membership) but only creates
+	Address objects as they are asked for.'''
+
+	__slots__ = ('_ints',)
+
+	def __init__(self, ints):
+		self._ints = ints
+
+	def __reduce__(self):
+		# __slots__ alone can't be pickled at protocols 0 and 1
+		return (self.__class__, (self._ints,), getattr(self,'__dict__',None))
+
+	def __len__(self):
+		return len(self._ints)
+
+	def __getitem__(self, key):
+		if type(key)==slice:
+			return AddressSequence(self._ints[key])
+		return Address(self._ints[key])
+
+	def __iter__(self):
+		for i in self._ints:
+			yield Address(i)
+
+	def __reversed__(self):
+		for i in reversed(self._ints):
+			yield Address(i)
+
+	def __contains__(self, o):
+		try:
+			return int(Address(o)) in self._ints
+		except (TypeError, ValueError):
+			return False
+
+	def index(self, o, start=0, stop=None):
+		# as Sequence.index(), but without looking at every address
+		try:
+			i = int(Address(o))
+		except (TypeError, ValueError):
+			raise ValueError('%r is not in sequence' % (o,))
+		positions = range(len(self._ints))[start:stop]
+		try:
+			return positions[self._ints[start:stop].index(i)]
+		except ValueError:
+			raise ValueError('%r is not in sequence' % (o,))
+
+	def count(self, o):
+		return int(o in self)
+
+	def __eq__(self, o):
+		if isinstance(o, AddressSequence):
+			return self._ints == o._ints
+		elif isinstance(o, (list, tuple)):
+			return list(self) == list(o)
+		return NotImplemented
+
+	def __repr__(self):
+		return '%s(%r)' % (self.__class__.__name__, self._ints)
+
+def summarizeRange(first, last):
+
+	'''given a first and last address (integers or Address objects), return
+	the smallest list of Prefix objects which exactly cover them (at most
+	62), in address order.'''
+
+	first = int(first)
+	last = int(last)
+	rv = []
+	while first <= last:
+		# the largest block which starts at first without going past last
+		if first == 0:
+			align = 32
+		else:
+			align = (first & -first).bit_length() - 1
+		bits = min(align, (last - first + 1).bit_length() - 1)
+		rv.append(Prefix(first, Netmask(32 - bits)))
+		first += 1 << bits
+	return rv
@@ -1,26 +1,63 @@
 
+from bisect import bisect_left, bisect_right
+
 from ipcidrtree import Address, Prefix
-from ipcidrtree.iprange import Range
+from ipcidrtree.iprange import Range, summarizeRange
+
+def _edges(firsts, lasts):
+	rv = [0] * (len(firsts) * 2)
+	rv[0::2] = firsts
+	rv[1::2] = [x+1 for x in lasts]
+	return rv
+
+def collapsePrefixes(prefixes):
+
+	'''given an iterable of Prefix objects, return the smallest list of
+	Prefixes covering the same addresses, merging adjacent and
+	overlapping prefixes (e.g. 10.0.0.0/25 and 10.0.0.128/25 become
+	10.0.0.0/24).'''
+
+	s = IPSet()
+	for p in prefixes:
+		first = int(p.address())
+		s._add_interval(first, first+len(p)-1)
+	return s.to_prefixes()
 
 class IPSet:
 	def __init__(self):
 		self._items = set()
-		self._prefixes = set()
-		self._ranges = set()
-		self._addresses = set()
-		self._all_addresses = set()
+
+		# every address in this set, as sorted inclusive intervals of
+		# integers (_firsts[i] through _lasts[i]). intervals never overlap
+		# or touch; adding merges them.
+		self._firsts = []
+		self._lasts = []
+		self._count = 0
 
 	def items(self):
-		'''return all Address/Range/Prefix objects that were specifically added to this set.'''
+
+		'''return all Address/Range/Prefix objects that were specifically
+		added to this set. For sets which are the result of an
+		intersection, difference or symmetric difference these are Range
+		objects for each run of consecutive addresses.'''
+
+		if self._items is None:
+			self._items = set(
+				Range(Address(first), Address(last))
+				for (first, last) in zip(self._firsts, self._lasts)
+			)
 		return self._items
 
 	def addresses(self):
 
-		'''returns a set containing Address objects for *all* IP addresses
+		'''returns an iterator over Address objects for *all* IP addresses
 		in this IPSet no matter how they were added (i.e. part of a Range,
-		Prefix, etc).'''
+		Prefix, etc), in numeric order. Addresses are created as they are
+		iterated over.'''
 
-		return self._all_addresses
+		for (first, last) in zip(self._firsts, self._lasts):
+			for i in range(first, last+1):
+				yield Address(i)
 	
 	def addressGroups(self, max=16):
 
@@ -63,64 +100,157 @@ class IPSet:
 		elif issubclass(o.__class__, Range):
 			return self.containsRange(o)
 		elif issubclass(o.__class__, Address):
-			return Prefix(o) in self
+			return self.containsAddress(o)
 		else:
 			raise TypeError('unable to test for type %s in IPSet  object' % (o.__class__.__name__))
 
 	def __len__(self):
-		return len(self._all_addresses)
+		return self._count
+
+	def to_prefixes(self):
+		'''return the smallest list of Prefix objects which together cover
+		exactly the addresses in this set, in address order.'''
+		rv = []
+		for (first, last) in zip(self._firsts, self._lasts):
+			rv.extend(summarizeRange(first, last))
+		return rv
+
+	def __or__(self, other):
+		if not isinstance(other, IPSet):
+			return NotImplemented
+		rv = self._combine(other, lambda a, b: a or b)
+		rv._items = self.items() | other.items()
+		return rv
+
+	def __and__(self, other):
+		if not isinstance(other, IPSet):
+			return NotImplemented
+		return self._combine(other, lambda a, b: a and b)
+
+	def __sub__(self, other):
+		if not isinstance(other, IPSet):
+			return NotImplemented
+		return self._combine(other, lambda a, b: a and not b)
+
+	def __xor__(self, other):
+		if not isinstance(other, IPSet):
+			return NotImplemented
+		return self._combine(other, lambda a, b: a != b)
+
+	def __ior__(self, other):
+		return self._replace(self | other)
+
+	def __iand__(self, other):
+		return self._replace(self & other)
+
+	def __isub__(self, other):
+		return self._replace(self - other)
+
+	def __ixor__(self, other):
+		return self._replace(self ^ other)
+
+	def _replace(self, other):
+		if other is NotImplemented:
+			return other
+		self._items = other._items
+		self._firsts = other._firsts
+		self._lasts = other._lasts
+		self._count = other._count
+		return self
+
+	def _combine(self, other, keep):
+
+		'''return a new IPSet holding the addresses for which keep(in_self,
+		in_other) is true. Works by a single merge over the boundaries of
+		both sets' intervals, so it never looks at individual addresses.'''
+
+		# interval boundaries as a sorted list of points where membership
+		# toggles: first, last+1, first, last+1...
+		edges_a = _edges(self._firsts, self._lasts)
+		edges_b = _edges(other._firsts, other._lasts)
+		len_a = len(edges_a)
+		len_b = len(edges_b)
+
+		out = []
+		i = j = 0
+		in_a = in_b = inside = False
+		while i < len_a or j < len_b:
+			if j == len_b or (i < len_a and edges_a[i] <= edges_b[j]):
+				x = edges_a[i]
+			else:
+				x = edges_b[j]
+			if i < len_a and edges_a[i] == x:
+				in_a = not in_a
+				i += 1
+			if j < len_b and edges_b[j] == x:
+				in_b = not in_b
+				j += 1
+			if keep(in_a, in_b) != inside:
+				inside = not inside
+				out.append(x)
+
+		rv = IPSet()
+		rv._items = None
+		rv._firsts = out[0::2]
+		rv._lasts = [x-1 for x in out[1::2]]
+		rv._count = sum(out[1::2]) - sum(rv._firsts)
+		return rv
 
 	###########################################
 	
 	def addPrefix(self, o):
-		self._items.add(o)
-		self._prefixes.add(o)
-		for addr in o.addrs():
-			self._all_addresses.add(addr.address())
+		self.items().add(o)
+		first = int(o.address())
+		self._add_interval(first, first+len(o)-1)
 	
 	def addRange(self, o):
-		self._items.add(o)
-		self._ranges.add(o)
-		for addr in o:
-			self._all_addresses.add( addr)
+		self.items().add(o)
+		# as iterating it does, so a reversed Range is just its end
+		ints = o._ints()
+		self._add_interval(ints.start, ints.stop-1)
 	
 	def addAddress(self, o):
-		self._items.add(o)
-		self._addresses.add(o)
-		self._all_addresses.add(o)
-	
+		self.items().add(o)
+		self._add_interval(int(o), int(o))
+
+	def _add_interval(self, first, last):
+
+		'''add the addresses first through last (integers) to the set,
+		merging with any intervals they overlap or adjoin.'''
+
+		firsts = self._firsts
+		lasts = self._lasts
+		# intervals i up to j overlap or adjoin the new one
+		i = bisect_left(lasts, first-1)
+		j = bisect_right(firsts, last+1)
+		removed = 0
+		if i < j:
+			first = min(first, firsts[i])
+			last = max(last, lasts[j-1])
+			for k in range(i, j):
+				removed += lasts[k] - firsts[k] + 1
+		firsts[i:j] = [first]
+		lasts[i:j] = [last]
+		self._count += last - first + 1 - removed
+
+	def _covers(self, first, last):
+		'''are all of the addresses first through last (integers) in the set?'''
+		i = bisect_right(self._firsts, first) - 1
+		return i >= 0 and self._lasts[i] >= last
 	
 	def containsPrefix(self, o):
 		if not issubclass(o.__class__, Prefix):
 			raise TypeError(o)
-		if o in self._prefixes:
-			return True
-		for sprefix in self._prefixes:
-			if o==sprefix or o in sprefix:
-				return True
-		for range in self._ranges:
-			if o in range:
-				return True
-		for addr in self._addresses:
-			if o == addr:
-				return True
-		return False
+		first = int(o.address())
+		return self._covers(first, first+len(o)-1)
 	
 	def containsRange(self, o):
 		if not issubclass(o.__class__, Range):
 			raise TypeError(o)
-		if o in self._ranges:
-			return True
-		for irange in self._ranges:
-			if o==irange or o in irange:
-				return True
-		for iprefix in self._prefixes:
-			if o in iprefix:
-				return True
-		return False
+		ints = o._ints()
+		return self._covers(ints.start, ints.stop-1)
 	
 	def containsAddress(self, o):
 		if not issubclass(o.__class__, Address):
 			raise TypeError(o)
-		return o in self._all_addresses
-	
+		return self._covers(int(o), int(o))
@@ -0,0 +1,91 @@
+
+'''Classify large numbers of addresses against a PrefixNode tree using a
+pool of worker processes.
+
+Example:
+
+	from ipcidrtree.parallel import classify
+	for (addr, node) in zip(addrs, classify(tree, addrs, workers=4)):
+		...
+'''
+
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ipcidrtree import Address
+
+# trees being classified, by token. Forked workers inherit this; others
+# receive their tree once, through _init_worker().
+_trees = {}
+_tokens = itertools.count()
+
+def _init_worker(token, tree):
+	_trees[token] = tree
+
+def _classify_chunk(token, chunk):
+	'''runs in a worker: returns lpm_indexes() for a chunk of addresses.
+	Like lpm(), raises ValueError for integers out of range.'''
+	keys = [a if type(a)==int else int(Address(a)) for a in chunk]
+	return _trees[token].lpm_indexes(keys)
+
+def _chunks(iterable, size):
+	it = iter(iterable)
+	while True:
+		chunk = list(itertools.islice(it, size))
+		if not chunk:
+			return
+		yield chunk
+
+def classify(tree, addresses, workers=None, chunksize=20000, mp_context=None):
+
+	'''yields, for each address in the iterable addresses (integers,
+	strings or Address objects), the most specific PrefixNode in tree
+	containing it, or None; i.e. tree.lpm(address). Results come back in
+	the same order as the addresses, as soon as each chunk of chunksize
+	addresses has been classified.
+
+	The work is spread over a ProcessPoolExecutor of workers processes
+	(default: one per CPU), started by mp_context (default: the
+	multiprocessing default context). The tree is shared with the workers
+	once, rather than being sent with each chunk: if the context forks,
+	workers inherit it; otherwise each worker is sent a pickled copy when
+	it starts. Workers answer with node indexes (see
+	PrefixNode.lpm_indexes()) which are mapped back to this process's
+	nodes. Only a few chunks per worker are in flight at a time, so
+	addresses may be a generator over more data than fits in memory.'''
+
+	if workers is None:
+		workers = os.cpu_count() or 1
+
+	# build the lookup tables now, so forked workers start with them
+	nodes = tree.lpm_nodes()
+	tree.lpm_indexes([])
+
+	token = next(_tokens)
+	if mp_context is None:
+		# fork only where it is already the default: it isn't safe
+		# everywhere it is available (e.g. macOS)
+		mp_context = multiprocessing.get_context()
+	options = {'mp_context': mp_context}
+	if mp_context.get_start_method() == 'fork':
+		_trees[token] = tree
+	else:
+		options['initializer'] = _init_worker
+		options['initargs'] = (token, tree)
+
+	try:
+		with ProcessPoolExecutor(workers, **options) as executor:
+			pending = deque()
+			for chunk in _chunks(addresses, chunksize):
+				pending.append(executor.submit(_classify_chunk, token, chunk))
+				if len(pending) >= workers*2:
+					for i in pending.popleft().result():
+						yield nodes[i] if i >= 0 else None
+			while pending:
+				for i in pending.popleft().result():
+					yield nodes[i] if i >= 0 else None
+	finally:
+		_trees.pop(token, None)
@@ -0,0 +1,259 @@
+
+'''A compact binary file format for PrefixNode trees, which can be opened
+with mmap and searched in place without reading the whole tree back
+into PrefixNode objects.
+
+The file is a sequence of native byte order 32 bit unsigned integers:
+
+	header:     magic ('IPCT'), version, byte order mark, node count,
+	            interval count
+	nodes:      one 5-word record per node, in breadth-first order so
+	            the children of a node are consecutive and sorted by
+	            address: address, prefix length, index of first child,
+	            number of children, payload (NONE if none)
+	intervals:  the flattened longest prefix match table (see
+	            PrefixNode.lpm()): the start address of each interval,
+	            followed by the node index covering each (NONE if none)
+
+Example:
+
+	writeTree(tree, 'routes.ipct', payload=lambda node: asn_index[node])
+	with MappedTree('routes.ipct') as mt:
+		node = mt.lpm('10.1.2.3')
+'''
+
+import mmap
+from array import array
+from bisect import bisect_right
+
+from ipcidrtree import Address, Netmask, Prefix, _plen_masks, _trie_values
+
+MAGIC = 0x54435049 # 'IPCT' read as a little-endian word
+VERSION = 1
+BOM = 0x01020304
+NONE = 0xffffffff
+
+HEADER_WORDS = 5
+RECORD_WORDS = 5
+
+def writeTree(tree, f, payload=None):
+
+	'''write the tree rooted at the PrefixNode tree to f (a filename or a
+	file opened for binary writing). If given, payload is called with each
+	PrefixNode and should return an integer from 0 up to but not including
+	NONE (e.g. an index into a table of your own data) or None; it is
+	stored with the node.'''
+
+	# breadth-first, so each node's children end up next to each other
+	nodes = [tree]
+	records = array('I')
+	for node in nodes:
+		children = list(_trie_values(node._trie))
+		value = None
+		if payload is not None:
+			value = payload(node)
+			if value is not None and not 0 <= value < NONE:
+				raise ValueError('payload for %s out of range: %d' % (node.prefix, value))
+		records.extend( (
+			int(node.prefix.addr),
+			node.prefix.netmask.prefix_len(),
+			len(nodes) if children else 0,
+			len(children),
+			NONE if value is None else value
+		) )
+		nodes.extend(children)
+
+	index = dict( (id(node), i) for (i, node) in enumerate(nodes) )
+	table = tree._lpm_build()
+	starts = array('I', table[1])
+	owners = array('I', [NONE if n is None else index[id(n)] for n in table[2]])
+
+	header = array('I', [MAGIC, VERSION, BOM, len(nodes), len(starts)])
+	if isinstance(f, str):
+		with open(f, 'wb') as fh:
+			_write(fh, (header, records, starts, owners))
+	else:
+		_write(f, (header, records, starts, owners))
+
+def _write(fh, arrays):
+	for a in arrays:
+		fh.write(a.tobytes())
+
+class MappedTree:
+
+	'''a tree written by writeTree(), memory-mapped read-only. Lookups read
+	only the records they pass through and return MappedNode objects.'''
+
+	def __init__(self, path):
+		with open(path, 'rb') as fh:
+			self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+		words = None
+		try:
+			if len(self._mmap) < HEADER_WORDS*4 or len(self._mmap) % 4:
+				raise ValueError('%s is not a tree file' % path)
+			words = memoryview(self._mmap).cast('I')
+			if words[0] != MAGIC or words[2] != BOM:
+				raise ValueError('%s is not a tree file for this byte order' % path)
+			if words[1] != VERSION:
+				raise ValueError('unsupported tree file version %d' % words[1])
+			self._count = words[3]
+			intervals = words[4]
+			nodes_end = HEADER_WORDS + self._count*RECORD_WORDS
+			if len(words) != nodes_end + 2*intervals:
+				raise ValueError('%s is truncated' % path)
+		except Exception:
+			# the mmap can't be closed while a view of it exists
+			if words is not None:
+				words.release()
+			self._mmap.close()
+			raise
+		self._words = words
+		self._starts = words[nodes_end:nodes_end+intervals]
+		self._owners = words[nodes_end+intervals:]
+
+	def close(self):
+		self._starts.release()
+		self._owners.release()
+		self._words.release()
+		self._mmap.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def __len__(self):
+		return self._count
+
+	def root(self):
+		return MappedNode(self, 0)
+
+	def node(self, i):
+		if not 0 <= i < self._count:
+			raise IndexError('node index out of range')
+		return MappedNode(self, i)
+
+	def _child_containing(self, i, a, l):
+
+		'''return the index of the child of node i whose prefix contains
+		or equals the one with integer address a and length l, or None.'''
+
+		w = self._words
+		rec = HEADER_WORDS + i*RECORD_WORDS
+		lo = w[rec+2]
+		hi = lo + w[rec+3]
+		# children are sorted by address: find the last one starting at
+		# or before a
+		while lo < hi:
+			mid = (lo+hi)//2
+			if w[HEADER_WORDS + mid*RECORD_WORDS] <= a:
+				lo = mid+1
+			else:
+				hi = mid
+		if lo == w[rec+2]:
+			return None
+		c = lo-1
+		crec = HEADER_WORDS + c*RECORD_WORDS
+		cplen = w[crec+1]
+		if cplen <= l and (a & _plen_masks[cplen]) == w[crec]:
+			return c
+		return None
+
+	def _descend(self, key):
+
+		'''walk towards key. returns (index of the deepest node containing
+		or equal to key, whether it is equal), or (None, False).'''
+
+		if not isinstance(key, Prefix):
+			key = Prefix(key)
+		a = int(key.addr)
+		l = key.netmask.prefix_len()
+		w = self._words
+		plen = w[HEADER_WORDS+1]
+		if plen > l or (a & _plen_masks[plen]) != w[HEADER_WORDS]:
+			return (None, False)
+		i = 0
+		while plen != l:
+			c = self._child_containing(i, a, l)
+			if c is None:
+				break
+			i = c
+			plen = w[HEADER_WORDS + i*RECORD_WORDS + 1]
+		return (i, plen == l)
+
+	def find(self, key):
+		'''like PrefixNode.find(): returns the MappedNode exactly matching
+		the Prefix key, or None.'''
+		(i, exact) = self._descend(key)
+		if not exact:
+			return None
+		return MappedNode(self, i)
+
+	def find_loose(self, key):
+		'''like PrefixNode.find_loose(): returns the closest MappedNode
+		containing the Prefix key, or None.'''
+		(i, exact) = self._descend(key)
+		if i is None:
+			return None
+		return MappedNode(self, i)
+
+	def lpm(self, key):
+		'''like PrefixNode.lpm(): returns the most specific MappedNode
+		containing the address key (an integer or anything acceptable to
+		Address()), or None.'''
+		if type(key) != int:
+			key = int(Address(key))
+		elif not 0 <= key <= 4294967295:
+			raise ValueError('Invalid integer IPv4 number: %d (out of range)' % key)
+		i = self._owners[bisect_right(self._starts, key)-1]
+		if i == NONE:
+			return None
+		return MappedNode(self, i)
+
+class MappedNode:
+
+	'''a node of a MappedTree. Holds only the tree and the node's index;
+	everything else is read from the file when asked for.'''
+
+	__slots__ = ('tree', 'index')
+
+	def __init__(self, tree, index):
+		self.tree = tree
+		self.index = index
+
+	def _word(self, n):
+		return self.tree._words[HEADER_WORDS + self.index*RECORD_WORDS + n]
+
+	@property
+	def prefix(self):
+		return Prefix(self._word(0), Netmask(self._word(1)))
+
+	@property
+	def payload(self):
+		'''the payload stored by writeTree() for this node, or None.'''
+		value = self._word(4)
+		if value == NONE:
+			return None
+		return value
+
+	@property
+	def children(self):
+		first = self._word(2)
+		return [MappedNode(self.tree, i) for i in range(first, first+self._word(3))]
+
+	def __eq__(self, o):
+		return (
+			isinstance(o, MappedNode) and
+			self.tree is o.tree and
+			self.index == o.index
+		)
+
+	def __hash__(self):
+		return hash( (id(self.tree), self.index) )
+
+	def __str__(self):
+		return str(self.prefix)
+
+	def __repr__(self):
+		return '%s(%s)' % (self.__class__.__name__, self.prefix)
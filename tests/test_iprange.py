@@ -0,0 +1,84 @@
+import unittest
+
+from ipcidrtree import Address, Prefix
+from ipcidrtree.iprange import Range, parseRange, parseRangeBounds, parseRanges
+
+class RangeTests(unittest.TestCase):
+
+	def test_to_prefixes(self):
+		self.assertEqual(
+			[str(p) for p in Range('10.0.0.1-10.0.0.8').to_prefixes()],
+			['10.0.0.1/32', '10.0.0.2/31', '10.0.0.4/30', '10.0.0.8/32'])
+
+	def test_reversed_to_prefixes(self):
+		r = Range(Address('10.0.0.5'), Address('10.0.0.3'))
+		self.assertEqual(len(r), 1)
+		self.assertEqual(r.to_prefixes(), [Prefix('10.0.0.3/32')])
+
+class AddressSequenceTests(unittest.TestCase):
+
+	def test_sequence(self):
+		seq = parseRange('10.0.0.1-5')
+		self.assertEqual(len(seq), 5)
+		self.assertEqual(seq[0], Address('10.0.0.1'))
+		self.assertEqual(seq[-1], Address('10.0.0.5'))
+		self.assertEqual(list(seq[1:3]), [Address('10.0.0.2'), Address('10.0.0.3')])
+		self.assertEqual(list(reversed(seq))[0], Address('10.0.0.5'))
+		self.assertTrue(Address('10.0.0.3') in seq)
+		self.assertFalse(Address('10.0.0.6') in seq)
+		self.assertFalse('bogus' in seq)
+		self.assertEqual(seq.count(Address('10.0.0.3')), 1)
+
+	def test_index(self):
+		seq = parseRange('10.0.0.1-5')
+		a = Address('10.0.0.3')
+		self.assertEqual(seq.index(a), 2)
+		self.assertEqual(seq.index(a, 0), 2)
+		self.assertEqual(seq.index(a, 2, 3), 2)
+		self.assertEqual(seq.index(a, -4), 2)
+		self.assertEqual(seq.index('10.0.0.3', 1, -1), 2)
+		self.assertEqual(seq[1:].index(a), 1)
+		self.assertRaises(ValueError, seq.index, a, 3)
+		self.assertRaises(ValueError, seq.index, a, 0, 2)
+		self.assertRaises(ValueError, seq.index, Address('10.0.0.9'))
+		self.assertRaises(ValueError, seq.index, 'bogus')
+		self.assertRaises(ValueError, seq.index, None)
+
+class ParseRangeTests(unittest.TestCase):
+
+	def test_bounds(self):
+		self.assertEqual(parseRangeBounds('10.0.0.1-9'), (167772161, 167772169))
+		self.assertEqual(parseRangeBounds('10.0.0.1 - 10.0.1.2'), (167772161, 167772418))
+		self.assertEqual(parseRangeBounds('10.0.0.7-7'), (167772167, 167772167))
+
+	def test_bounds_reversed(self):
+		# an end before the start yields just the end
+		self.assertEqual(parseRangeBounds('10.0.0.9-1'), (167772161, 167772161))
+		self.assertEqual(parseRangeBounds('10.0.1.0-10.0.0.5'), (167772165, 167772165))
+
+	def test_bounds_invalid(self):
+		for s in ('10.0.0.1', '10.0.0.1-', '10.0.0.1-300', '10.0.0.1-10.0.0',
+				'10.0.0.256-10.0.1.1', 'bogus'):
+			self.assertRaises(ValueError, parseRangeBounds, s)
+
+	def test_ranges(self):
+		lines = [
+			'# a comment\n',
+			'10.0.0.1-9\n',
+			'\n',
+			'   \n',
+			'  10.0.1.0-10.0.1.255  \n',
+			'10.0.2.9-1',
+		]
+		ranges = list(parseRanges(lines))
+		self.assertEqual([str(r) for r in ranges],
+			['10.0.0.1-10.0.0.9', '10.0.1.0-10.0.1.255', '10.0.2.1-10.0.2.1'])
+		self.assertEqual(ranges[0], Range('10.0.0.1-9'))
+
+	def test_ranges_invalid(self):
+		it = parseRanges(['10.0.0.1-9', '10.0.0.1/24'])
+		self.assertEqual(str(next(it)), '10.0.0.1-10.0.0.9')
+		self.assertRaises(ValueError, next, it)
+
+if __name__ == '__main__':
+	unittest.main()
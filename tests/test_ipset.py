@@ -0,0 +1,135 @@
+import unittest
+
+from ipcidrtree import Address, Prefix
+from ipcidrtree.iprange import Range
+from ipcidrtree.ipset import IPSet, collapsePrefixes
+
+class IPSetTests(unittest.TestCase):
+
+	def test_add(self):
+		s = IPSet()
+		s.add(Prefix('10.0.0.0/30'))
+		s.add(Range('10.0.0.4-9'))
+		s.add(Address('10.0.0.20'))
+		self.assertEqual(len(s), 11)
+		self.assertTrue(Prefix('10.0.0.0/29') in s)
+		self.assertTrue(Range('10.0.0.2-7') in s)
+		self.assertFalse(Range('10.0.0.9-10') in s)
+		self.assertEqual(
+			[str(p) for p in s.to_prefixes()],
+			['10.0.0.0/29', '10.0.0.8/31', '10.0.0.20/32'])
+
+	def test_reversed_range(self):
+		# like iterating it, a Range ending before it starts is just its end
+		r = Range(Address('10.0.0.5'), Address('10.0.0.3'))
+		s = IPSet()
+		s.add(r)
+		self.assertEqual(len(s), 1)
+		self.assertEqual(list(s.addresses()), [Address('10.0.0.3')])
+		self.assertTrue(r in s)
+		self.assertFalse(Range(Address('10.0.0.5'), Address('10.0.0.4')) in s)
+
+def ipset(*items):
+	'''an IPSet of address strings and ranges like '10.0.0.1-9' '''
+	s = IPSet()
+	for i in items:
+		if '-' in i:
+			s.add(Range(i))
+		else:
+			s.add(Address(i))
+	return s
+
+def spans(s):
+	'''the set's addresses as a list of first-last strings'''
+	return [str(r) for r in sorted(s.items(), key=lambda r: r.first())]
+
+class IPSetOperatorTests(unittest.TestCase):
+
+	def test_or(self):
+		# adjacent intervals merge
+		u = ipset('10.0.0.1-4') | ipset('10.0.0.5-9', '10.0.0.20')
+		self.assertEqual(len(u), 10)
+		self.assertEqual([str(p) for p in u.to_prefixes()],
+			['10.0.0.1/32', '10.0.0.2/31', '10.0.0.4/30', '10.0.0.8/31', '10.0.0.20/32'])
+		# the union keeps what was added to either side
+		self.assertEqual(len(u.items()), 3)
+
+	def test_and(self):
+		a = ipset('10.0.0.1-10', '10.0.0.20-30')
+		b = ipset('10.0.0.10-20', '10.0.0.30-40')
+		i = a & b
+		self.assertEqual(len(i), 3)
+		# edges which only touch still count once
+		self.assertEqual(spans(i),
+			['10.0.0.10-10.0.0.10', '10.0.0.20-10.0.0.20', '10.0.0.30-10.0.0.30'])
+		self.assertEqual(len(ipset('10.0.0.1-4') & ipset('10.0.0.5-9')), 0)
+
+	def test_sub(self):
+		d = ipset('10.0.0.1-10') - ipset('10.0.0.4-6')
+		self.assertEqual(len(d), 7)
+		self.assertEqual(spans(d), ['10.0.0.1-10.0.0.3', '10.0.0.7-10.0.0.10'])
+		self.assertEqual(len(ipset('10.0.0.4-6') - ipset('10.0.0.1-10')), 0)
+
+	def test_xor(self):
+		x = ipset('10.0.0.1-10') ^ ipset('10.0.0.6-15')
+		self.assertEqual(len(x), 10)
+		self.assertEqual(spans(x), ['10.0.0.1-10.0.0.5', '10.0.0.11-10.0.0.15'])
+		# adjacent intervals have nothing in common, so they merge
+		x = ipset('10.0.0.1-4') ^ ipset('10.0.0.5-9')
+		self.assertEqual(spans(x), ['10.0.0.1-10.0.0.9'])
+
+	def test_empty(self):
+		a = ipset('10.0.0.1-10')
+		e = IPSet()
+		self.assertEqual(spans(a | e), ['10.0.0.1-10.0.0.10'])
+		self.assertEqual(len(a & e), 0)
+		self.assertEqual(len(e & a), 0)
+		self.assertEqual(len(a - e), 10)
+		self.assertEqual(len(e - a), 0)
+		self.assertEqual(len(a ^ e), 10)
+		self.assertEqual(len(e ^ e), 0)
+		self.assertEqual(spans(e & a), [])
+
+	def test_in_place(self):
+		a = ipset('10.0.0.1-10')
+		b = a
+		a |= ipset('10.0.0.11')
+		a -= ipset('10.0.0.1-2')
+		a &= ipset('10.0.0.0-9')
+		self.assertIs(a, b)
+		self.assertEqual(spans(a), ['10.0.0.3-10.0.0.9'])
+		a ^= ipset('10.0.0.9-10')
+		self.assertIs(a, b)
+		self.assertEqual(spans(a), ['10.0.0.3-10.0.0.8', '10.0.0.10-10.0.0.10'])
+		self.assertTrue(Address('10.0.0.10') in a)
+		self.assertFalse(Address('10.0.0.9') in a)
+
+	def test_not_ipset(self):
+		a = ipset('10.0.0.1')
+		self.assertRaises(TypeError, lambda: a | [Address('10.0.0.2')])
+		self.assertRaises(TypeError, lambda: a & None)
+
+class CollapsePrefixesTests(unittest.TestCase):
+
+	def collapse(self, *prefixes):
+		return [str(p) for p in collapsePrefixes(Prefix(p) for p in prefixes)]
+
+	def test_adjacent(self):
+		self.assertEqual(self.collapse('10.0.0.0/25', '10.0.0.128/25'), ['10.0.0.0/24'])
+		self.assertEqual(self.collapse('10.0.1.0/24', '10.0.0.0/24', '10.0.2.0/24'),
+			['10.0.0.0/23', '10.0.2.0/24'])
+		# adjacent, but not on a boundary they could merge across
+		self.assertEqual(self.collapse('10.0.1.0/24', '10.0.2.0/24'),
+			['10.0.1.0/24', '10.0.2.0/24'])
+
+	def test_overlapping(self):
+		self.assertEqual(self.collapse('10.0.0.0/16', '10.0.5.0/24', '10.0.5.7'),
+			['10.0.0.0/16'])
+		self.assertEqual(self.collapse('10.0.0.0/24', '10.0.0.0/24', '10.0.0.128/25',
+			'10.0.1.0/24'), ['10.0.0.0/23'])
+
+	def test_empty(self):
+		self.assertEqual(self.collapse(), [])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,46 @@
+import multiprocessing
+import random
+import unittest
+
+from ipcidrtree import PrefixNode
+from ipcidrtree.parallel import classify
+
+class ClassifyTests(unittest.TestCase):
+
+	def setUp(self):
+		self.tree = PrefixNode.from_iterable(
+			['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24', '192.168.0.0/16'])
+
+		rnd = random.Random(1)
+		self.addrs = [rnd.choice([0x0a000000, 0x0a010000, 0x0a010200, 0xc0a80000]) | rnd.getrandbits(12)
+			for i in range(500)]
+		self.addrs += ['10.1.2.3', '8.8.8.8']
+
+	def test_classify(self):
+		expected = [self.tree.lpm(a) for a in self.addrs]
+		found = list(classify(self.tree, self.addrs, workers=2, chunksize=64))
+		self.assertEqual(len(found), len(expected))
+		for (f, e) in zip(found, expected):
+			self.assertIs(f, e)
+
+	def test_generator(self):
+		expected = [self.tree.lpm(a) for a in self.addrs]
+		found = list(classify(self.tree, (a for a in self.addrs), workers=2, chunksize=50))
+		self.assertEqual(found, expected)
+
+	def test_spawn(self):
+		# workers which don't fork are sent the tree instead
+		if 'spawn' not in multiprocessing.get_all_start_methods():
+			self.skipTest('no spawn start method')
+		expected = [self.tree.lpm(a) for a in self.addrs]
+		found = list(classify(self.tree, self.addrs, workers=1, chunksize=200,
+			mp_context=multiprocessing.get_context('spawn')))
+		self.assertEqual(found, expected)
+
+	def test_range(self):
+		for bad in (2**33, -1):
+			with self.assertRaises(ValueError):
+				list(classify(self.tree, [0x0a000001, bad], workers=1))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,193 @@
+import functools
+import itertools
+import pickle
+import unittest
+
+from ipcidrtree import IPNumber, Address, Netmask, Prefix, Parser
+from ipcidrtree.iprange import Range, AddressSequence
+from ipcidrtree.ipset import IPSet
+
+class EqualityTests(unittest.TestCase):
+
+	def test_address(self):
+		a = Address('10.0.0.1')
+		self.assertTrue(a == '10.0.0.1')
+		self.assertTrue(a == 167772161)
+		self.assertFalse(a == None)
+		self.assertTrue(a != None)
+		self.assertFalse(a == 'bogus')
+		self.assertFalse(a == object())
+		self.assertTrue(a != Address('10.0.0.2'))
+
+	def test_address_and_host_prefix(self):
+		a = Address('10.0.0.1')
+		p = Prefix('10.0.0.1/32')
+		self.assertTrue(a == p)
+		self.assertTrue(p == a)
+		self.assertFalse(a != p)
+		self.assertEqual(hash(a), hash(p))
+		self.assertEqual(len(set([p, a])), 1)
+		self.assertFalse(p == None)
+
+	def test_prefix_and_address(self):
+		for s in ('10.0.0.0/8', '10.0.0.0/24', '10.0.0.0/32'):
+			p = Prefix(s)
+			a = Address('10.0.0.0')
+			self.assertTrue(p == a)
+			self.assertTrue(a == p)
+			self.assertEqual(hash(p), hash(a))
+		self.assertNotEqual(Prefix('10.0.0.0/8'), Prefix('10.0.0.0/16'))
+
+	def test_ipset_mixed(self):
+		s = IPSet()
+		s.add(Prefix('10.0.0.1/32'))
+		s.add(Address('10.0.0.1'))
+		self.assertEqual(len(s), 1)
+
+def old_lt(a, b):
+	'''Prefix.__lt__ as it was before sort_key(), written out in terms of
+	containment.'''
+	if a in b or b in a:
+		if a.netmask.prefix_len() == b.netmask.prefix_len():
+			return a.addr < b.addr
+		return a.netmask.prefix_len() > b.netmask.prefix_len()
+	return a.addr < b.addr
+
+ORDER_PREFIXES = [
+	'0.0.0.0/0', '0.0.0.0/1', '0.0.0.0/32', '10.0.0.0/8', '10.0.0.0/16',
+	'10.0.0.0/24', '10.0.0.0/32', '10.0.0.255/32', '10.0.255.0/24',
+	'10.1.0.0/16', '10.255.255.255/32', '11.0.0.0/8', '128.0.0.0/1',
+	'192.168.0.0/16', '255.255.255.255/32',
+]
+
+class OrderTests(unittest.TestCase):
+
+	def test_matches_old_lt(self):
+		prefixes = [Prefix(p) for p in ORDER_PREFIXES]
+		for (a, b) in itertools.product(prefixes, repeat=2):
+			self.assertEqual(a < b, old_lt(a, b), (a, b))
+			self.assertEqual(a.sort_key() < b.sort_key(), old_lt(a, b), (a, b))
+
+	def test_sorted(self):
+		prefixes = [Prefix(p) for p in reversed(ORDER_PREFIXES)]
+		old = sorted(prefixes, key=functools.cmp_to_key(
+			lambda a, b: -1 if old_lt(a, b) else (1 if old_lt(b, a) else 0)))
+		self.assertEqual([str(p) for p in sorted(prefixes)], [str(p) for p in old])
+		self.assertEqual([str(p) for p in sorted(prefixes, key=Prefix.sort_key)],
+			[str(p) for p in old])
+		# a prefix comes after the prefixes it contains
+		self.assertEqual([str(p) for p in old][:6], [
+			'0.0.0.0/32', '10.0.0.0/32', '10.0.0.255/32', '10.0.0.0/24',
+			'10.0.255.0/24', '10.0.0.0/16'])
+		self.assertEqual(str(old[-1]), '0.0.0.0/0')
+
+	def test_renumber_resets_key(self):
+		p = Prefix('10.1.0.0/16')
+		key = p.sort_key()
+		p.renumber(Prefix('10.2.0.0/16'))
+		self.assertNotEqual(p.sort_key(), key)
+		self.assertEqual(p.sort_key(), Prefix('10.2.0.0/16').sort_key())
+
+class ContainsTests(unittest.TestCase):
+
+	def test_prefix(self):
+		p = Prefix('10.1.0.0/16')
+		self.assertTrue(Prefix('10.1.2.0/24') in p)
+		self.assertTrue(Prefix('10.1.255.255/32') in p)
+		self.assertFalse(Prefix('10.2.0.0/24') in p)
+		self.assertFalse(Prefix('10.0.0.0/8') in p)
+		# a Prefix doesn't contain an equal one
+		self.assertFalse(Prefix('10.1.0.0/16') in p)
+		self.assertTrue(p in Prefix('0.0.0.0/0'))
+
+	def test_address_and_int(self):
+		p = Prefix('10.1.0.0/16')
+		for yes in (Address('10.1.0.0'), Address('10.1.255.255'), 0x0a010203, '10.1.2.3'):
+			self.assertTrue(yes in p, yes)
+		for no in (Address('10.2.0.0'), Address('10.0.255.255'), 0x0a020000, IPNumber(0)):
+			self.assertFalse(no in p, no)
+		self.assertTrue(IPNumber(0x0a010001) in p)
+		self.assertTrue(0xffffffff in Prefix('0.0.0.0/0'))
+		# like an equal /32, an address isn't within a /32
+		self.assertFalse(Address('10.1.2.3') in Prefix('10.1.2.3/32'))
+		self.assertFalse(0x0a010203 in Prefix('10.1.2.3/32'))
+
+	def test_int_out_of_range(self):
+		p = Prefix('0.0.0.0/0')
+		self.assertRaises(ValueError, p.__contains__, -1)
+		self.assertRaises(ValueError, p.__contains__, 2**32)
+
+	def test_range(self):
+		p = Prefix('10.1.0.0/16')
+		# a Range may cover all of the Prefix
+		self.assertTrue(Range('10.1.0.0-10.1.255.255') in p)
+		self.assertTrue(Range('10.1.2.3-9') in p)
+		self.assertFalse(Range('10.0.255.255-10.1.0.5') in p)
+		self.assertFalse(Range('10.1.255.0-10.2.0.0') in p)
+		self.assertTrue(Range('10.1.2.3-3') in Prefix('10.1.2.3/32'))
+
+	def test_contains_method(self):
+		p = Prefix('10.1.0.0/16')
+		self.assertTrue(p.contains('10.1.2.0/24'))
+		self.assertFalse(p.contains('10.2.0.0/24'))
+
+class NetmaskTests(unittest.TestCase):
+
+	def test_by_netsize(self):
+		for plen in range(33):
+			nm = Netmask.by_netsize(2**(32-plen))
+			self.assertIs(nm, Netmask(plen))
+			self.assertEqual(nm.prefix_len(), plen)
+			self.assertEqual(nm.netsize(), 2**(32-plen))
+		# a float log made these look like they weren't powers of two
+		self.assertEqual(Netmask.by_netsize(2**29).prefix_len(), 3)
+		self.assertEqual(Netmask.by_netsize(2**31).prefix_len(), 1)
+		self.assertEqual(Netmask.by_netsize(256.0).prefix_len(), 24)
+
+	def test_by_netsize_invalid(self):
+		for n in (0, -1, 3, 255, 2**32+1, 2**33, 256.5):
+			self.assertRaises(ValueError, Netmask.by_netsize, n)
+
+class PickleTests(unittest.TestCase):
+
+	def test_protocols(self):
+		values = [
+			IPNumber(5),
+			Address('10.1.2.3'),
+			Netmask(24),
+			Prefix('10.0.0.0/8'),
+			Prefix('10.1.2.3'),
+			Range('10.0.0.1-9'),
+			AddressSequence(range(167772161, 167772170, 2)),
+		]
+		for proto in range(pickle.HIGHEST_PROTOCOL+1):
+			for v in values:
+				copy = pickle.loads(pickle.dumps(v, proto))
+				self.assertIs(type(copy), type(v))
+				self.assertEqual(copy, v)
+				self.assertEqual(str(copy), str(v))
+
+class ParserCacheTests(unittest.TestCase):
+
+	def tearDown(self):
+		Parser().set_cache_size(1000)
+
+	def test_set_cache_size(self):
+		parser = Parser()
+		for s in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+			parser.parse_o(s)
+		parser.set_cache_size(1)
+		self.assertEqual(parser.cache_info().cur_len, 1)
+		parser.set_cache_size(0)
+		self.assertEqual(parser.cache_info().cur_len, 0)
+		parser.set_cache_size(None)
+		self.assertIsNone(parser.cache_info().max_len)
+
+	def test_set_cache_size_negative(self):
+		parser = Parser()
+		parser.set_cache_size(10)
+		self.assertRaises(ValueError, parser.set_cache_size, -1)
+		self.assertEqual(parser.cache_info().max_len, 10)
+
+if __name__ == '__main__':
+	unittest.main()
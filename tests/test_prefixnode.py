@@ -0,0 +1,356 @@
+import pickle
+import unittest
+from array import array
+
+from ipcidrtree import Prefix, PrefixNode, PPrefixNode, OrderedPrefixNode, DuplicatePrefixError
+
+def build(cls, root, *prefixes):
+	tree = cls(root)
+	for p in prefixes:
+		tree.add(p)
+	return tree
+
+def shape(tree):
+	'''the tree as a sorted list of (prefix string, depth) pairs'''
+	tree.sort()
+	return [(str(node), depth) for (node, depth) in tree.dfi()]
+
+class PrefixNodeTests(unittest.TestCase):
+
+	cls = PrefixNode
+
+	def tree(self, *prefixes):
+		return build(self.cls, '10.0.0.0/8', *prefixes)
+
+	def assertFindable(self, tree):
+		# every node can be found again through the indexes
+		for (node, depth) in tree.dfi():
+			self.assertIs(tree.find(node.prefix), node)
+
+	def test_add(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.2.0.0/16', '10.1.2.3')
+		self.assertEqual(shape(t), [
+			('10.0.0.0/8', 0),
+			('10.1.0.0/16', 1),
+			('10.1.2.0/24', 2),
+			('10.1.2.3/32', 3),
+			('10.2.0.0/16', 1),
+		])
+		self.assertFindable(t)
+
+	def test_add_outside(self):
+		t = self.tree()
+		self.assertFalse(t.add('192.168.0.0/16'))
+		self.assertFalse(self.tree('10.1.1.1').find('10.1.1.1').add('10.1.1.1'))
+
+	def test_add_duplicate(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24')
+		self.assertRaises(DuplicatePrefixError, t.add, '10.1.2.0/24')
+		self.assertFalse(t.add('10.0.0.0/8'))
+
+	def test_adoption(self):
+		t = self.tree('10.1.1.0/24', '10.1.3.0/24', '10.2.0.0/24', '10.1.3.7')
+		t.add('10.1.0.0/16')
+		self.assertEqual(shape(t), [
+			('10.0.0.0/8', 0),
+			('10.1.0.0/16', 1),
+			('10.1.1.0/24', 2),
+			('10.1.3.0/24', 2),
+			('10.1.3.7/32', 3),
+			('10.2.0.0/24', 1),
+		])
+		self.assertFindable(t)
+
+	def test_adoption_merge(self):
+		# the new node already has children; the adopted ones join them
+		t = self.tree('10.9.1.0/24', '10.9.3.0/24')
+		n = self.cls('10.9.0.0/16')
+		n.add('10.9.2.0/24')
+		n.add('10.9.3.4')
+		t.add(n)
+		self.assertEqual(shape(t), [
+			('10.0.0.0/8', 0),
+			('10.9.0.0/16', 1),
+			('10.9.1.0/24', 2),
+			('10.9.2.0/24', 2),
+			('10.9.3.0/24', 2),
+			('10.9.3.4/32', 3),
+		])
+		self.assertFindable(t)
+
+	def test_adoption_merge_duplicate(self):
+		# a clash between the new node's children and the adopted ones
+		# leaves both trees untouched
+		t = self.tree('10.9.1.0/24', '10.9.3.0/24')
+		before = shape(t)
+		n = self.cls('10.9.0.0/16')
+		n.add('10.9.1.0/24')
+		self.assertRaises(DuplicatePrefixError, t.add, n)
+		self.assertEqual(shape(t), before)
+		self.assertEqual(shape(n), [('10.9.0.0/16', 0), ('10.9.1.0/24', 1)])
+		self.assertFindable(t)
+
+	def test_prune(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.1.3.0/24', '10.2.0.0/16')
+		branch = t.prune('10.1.0.0/16')
+		self.assertEqual(str(branch), '10.1.0.0/16')
+		self.assertEqual(shape(branch), [
+			('10.1.0.0/16', 0),
+			('10.1.2.0/24', 1),
+			('10.1.3.0/24', 1),
+		])
+		self.assertEqual(shape(t), [('10.0.0.0/8', 0), ('10.2.0.0/16', 1)])
+		self.assertIsNone(t.find('10.1.2.0/24'))
+		self.assertIsNone(t.prune('10.1.0.0/16'))
+		self.assertRaises(ValueError, t.prune, '10.0.0.0/8')
+		self.assertFindable(t)
+
+	def listed(self, prefixes):
+		'''the order children added in this order are listed in'''
+		return prefixes
+
+	def test_prune_keeps_order(self):
+		added = ['10.4.0.0/16', '10.1.0.0/16', '10.3.0.0/16', '10.2.0.0/16', '10.5.0.0/16']
+		t = self.tree(*added)
+		t.prune('10.1.0.0/16')
+		t.prune('10.3.0.0/16')
+		expected = self.listed(['10.4.0.0/16', '10.2.0.0/16', '10.5.0.0/16'])
+		self.assertEqual([str(c) for c in t.children], expected)
+		# adopting removes several children at once
+		t.add('10.4.0.0/14')
+		expected = self.listed(['10.2.0.0/16', '10.4.0.0/14'])
+		self.assertEqual([str(c) for c in t.children], expected)
+		self.assertFindable(t)
+
+	def test_renumber(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.1.2.5')
+		t.renumber(Prefix('10.1.0.0/16'), Prefix('10.7.0.0/16'))
+		self.assertEqual(shape(t), [
+			('10.0.0.0/8', 0),
+			('10.7.0.0/16', 1),
+			('10.7.2.0/24', 2),
+			('10.7.2.5/32', 3),
+		])
+		self.assertFindable(t)
+
+	def test_renumber_rollback(self):
+		t = self.tree('10.1.0.0/16', '10.1.1.0/24', '10.1.2.0/24',
+			'10.9.1.0/24', '10.9.3.0/24')
+		before = shape(t)
+		self.assertRaises(DuplicatePrefixError, t.renumber,
+			Prefix('10.1.0.0/16'), Prefix('10.9.0.0/16'))
+		self.assertEqual(shape(t), before)
+		self.assertFindable(t)
+
+	def test_dfi(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.2.0.0/16')
+		t.sort()
+		self.assertEqual([(str(n), d) for (n, d) in t.dfi()], [
+			('10.0.0.0/8', 0),
+			('10.1.0.0/16', 1),
+			('10.1.2.0/24', 2),
+			('10.2.0.0/16', 1),
+		])
+		self.assertEqual([(str(n), d) for (n, d) in t.find('10.1.0.0/16').dfi(5)],
+			[('10.1.0.0/16', 5), ('10.1.2.0/24', 6)])
+
+	def test_dfi_post(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.1.2.3', '10.2.0.0/16')
+		t.sort()
+		self.assertEqual([(str(n), d) for (n, d) in t.dfi_post()], [
+			('10.1.2.3/32', 3),
+			('10.1.2.0/24', 2),
+			('10.1.0.0/16', 1),
+			('10.2.0.0/16', 1),
+			('10.0.0.0/8', 0),
+		])
+		self.assertEqual([(str(n), d) for (n, d) in t.find('10.1.2.0/24').dfi_post(1)],
+			[('10.1.2.3/32', 2), ('10.1.2.0/24', 1)])
+
+	def test_dfi_post_prune(self):
+		# removing nodes as they are visited skips none of them
+		t = self.tree('10.1.0.0/16', '10.2.0.0/16', '10.3.0.0/16', '10.4.0.0/16',
+			'10.1.1.0/24', '10.1.2.0/24', '10.1.3.0/24')
+		visited = []
+		for (n, d) in t.dfi_post():
+			if n is not t:
+				visited.append(str(n))
+				t.prune(n.prefix)
+		self.assertEqual(len(visited), 7)
+		self.assertEqual(t.children, [])
+
+	def test_dfi_part(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.1.2.3', '10.2.0.0/16', '10.2.9.0/24')
+		t.sort()
+		# descends only through the nodes in the filter, which can be
+		# given as Prefixes, PrefixNodes or strings
+		walk = [(str(n), d, f) for (n, d, f) in
+			t.dfi_part(filter=[Prefix('10.0.0.0/8'), t.find('10.1.0.0/16'), '10.2.9.0/24'])]
+		self.assertEqual(walk, [
+			('10.0.0.0/8', 0, True),
+			('10.1.0.0/16', 1, True),
+			('10.1.2.0/24', 2, False),
+			('10.2.0.0/16', 1, False),
+		])
+		# the default, empty filter yields just the root
+		self.assertEqual([(str(n), d, f) for (n, d, f) in t.dfi_part()],
+			[('10.0.0.0/8', 0, False)])
+		self.assertEqual([(str(n), d, f) for (n, d, f) in t.dfi_part(3)],
+			[('10.0.0.0/8', 3, False)])
+
+	def test_dfi_where(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.1.2.3', '10.2.0.0/16', '10.2.9.0/24')
+		t.sort()
+		walk = [(str(n), d, r) for (n, d, r) in
+			t.dfi_where(lambda n: n.prefix.netmask.prefix_len() < 24)]
+		self.assertEqual(walk, [
+			('10.0.0.0/8', 0, True),
+			('10.1.0.0/16', 1, True),
+			('10.1.2.0/24', 2, False),
+			('10.2.0.0/16', 1, True),
+			('10.2.9.0/24', 2, False),
+		])
+		# results are made booleans; a false root stops the walk
+		self.assertEqual([(str(n), d, r) for (n, d, r) in t.dfi_where(lambda n: 0, 2)],
+			[('10.0.0.0/8', 2, False)])
+		self.assertEqual(len(list(t.dfi_where(lambda n: n.children))), 6)
+
+	def test_bfi(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.1.2.3', '10.2.0.0/16', '10.2.9.0/24')
+		t.sort()
+		self.assertEqual([(str(n), d) for (n, d) in t.bfi()], [
+			('10.0.0.0/8', 0),
+			('10.1.0.0/16', 1),
+			('10.2.0.0/16', 1),
+			('10.1.2.0/24', 2),
+			('10.2.9.0/24', 2),
+			('10.1.2.3/32', 3),
+		])
+		self.assertEqual([(str(n), d) for (n, d) in t.find('10.1.0.0/16').bfi(1)],
+			[('10.1.0.0/16', 1), ('10.1.2.0/24', 2), ('10.1.2.3/32', 3)])
+
+	def test_lpm(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24')
+		self.assertIs(t.lpm('10.1.2.3'), t.find('10.1.2.0/24'))
+		self.assertIs(t.lpm(Prefix('10.1.3.0/32').addr), t.find('10.1.0.0/16'))
+		self.assertIs(t.lpm(0x0a020000), t)
+		self.assertIsNone(t.lpm('11.0.0.0'))
+		self.assertRaises(ValueError, t.lpm, -1)
+		self.assertRaises(ValueError, t.lpm, 2**32)
+
+	def test_lpm_indexes(self):
+		t = build(self.cls, '0.0.0.0/0', '10.0.0.0/8', '10.1.0.0/16', '255.255.255.0/24')
+		nodes = t.lpm_nodes()
+		self.assertEqual(sorted(str(n) for n in nodes),
+			['0.0.0.0/0', '10.0.0.0/8', '10.1.0.0/16', '255.255.255.0/24'])
+		addrs = [0x0a010203, 0x0a020000, 0x0b000000, 0xffffffff, 0]
+		found = [nodes[i] for i in t.lpm_indexes(array('I', addrs))]
+		self.assertEqual(found, [t.lpm(a) for a in addrs])
+		# addresses no node covers get -1
+		t = self.tree('10.1.0.0/16')
+		self.assertEqual(list(t.lpm_indexes([0x0b000000, 0x0a010000])),
+			[-1, t.lpm_nodes().index(t.find('10.1.0.0/16'))])
+		self.assertEqual(list(t.lpm_indexes([])), [])
+
+	def test_lpm_indexes_range(self):
+		t = build(self.cls, '0.0.0.0/0', '255.255.255.0/24')
+		self.assertRaises(ValueError, t.lpm_indexes, [-1])
+		self.assertRaises(ValueError, t.lpm_indexes, [2**33])
+		self.assertRaises(ValueError, t.lpm_indexes, [0, 2**32])
+
+	def test_lpm_after_change(self):
+		t = self.tree('10.1.0.0/16')
+		self.assertIs(t.lpm('10.1.2.3'), t.find('10.1.0.0/16'))
+		# changes made through a subtree are seen from the root
+		t.find('10.1.0.0/16').add('10.1.2.0/24')
+		self.assertIs(t.lpm('10.1.2.3'), t.find('10.1.2.0/24'))
+		t.prune('10.1.2.0/24')
+		self.assertIs(t.lpm('10.1.2.3'), t.find('10.1.0.0/16'))
+		# as are changes inside a subtree added with children
+		n = self.cls('10.2.0.0/16')
+		self.assertIs(n.lpm('10.2.0.1'), n)
+		t.add(n)
+		n.add('10.2.0.0/24')
+		self.assertIs(t.lpm('10.2.0.1'), t.find('10.2.0.0/24'))
+
+	def test_lpm_separate_trees(self):
+		# changing one tree leaves another tree's lookup table alone
+		t = self.tree('10.1.0.0/16')
+		other = build(self.cls, '192.168.0.0/16')
+		t.lpm('10.1.2.3')
+		table = t._lpm_table
+		other.add('192.168.1.0/24')
+		self.assertIs(t.lpm('10.1.2.3'), t.find('10.1.0.0/16'))
+		self.assertIs(t._lpm_table, table)
+
+	def test_from_iterable(self):
+		prefixes = ['10.2.0.0/16', '10.1.2.0/24', '10.1.0.0/16', '10.1.2.3']
+		t = self.cls.from_iterable(prefixes, root='10.0.0.0/8')
+		self.assertEqual(shape(t), shape(self.tree(*prefixes)))
+		self.assertFindable(t)
+		self.assertRaises(ValueError, self.cls.from_iterable,
+			['192.168.0.0/16'], root='10.0.0.0/8')
+
+	def test_from_iterable_duplicates(self):
+		prefixes = ['10.1.0.0/16', '10.1.2.0/24', '10.1.0.0/16', '10.0.0.0/8',
+			'10.1.2.0/24']
+		try:
+			self.cls.from_iterable(prefixes, root='10.0.0.0/8')
+		except DuplicatePrefixError as dpe:
+			self.assertEqual(sorted(str(p) for p in dpe.prefixes),
+				['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24'])
+		else:
+			self.fail('DuplicatePrefixError not raised')
+
+		found = []
+		t = self.cls.from_iterable(prefixes, root='10.0.0.0/8', duplicates=found)
+		self.assertEqual(len(found), 3)
+		self.assertEqual(shape(t), shape(self.tree('10.1.0.0/16', '10.1.2.0/24')))
+
+	def test_pickle(self):
+		t = self.tree('10.1.0.0/16', '10.1.2.0/24', '10.2.0.0/16')
+		for proto in range(pickle.HIGHEST_PROTOCOL+1):
+			copy = pickle.loads(pickle.dumps(t, proto))
+			self.assertIs(type(copy), self.cls)
+			self.assertEqual(shape(copy), shape(t))
+			self.assertFindable(copy)
+
+class OrderedPrefixNodeTests(PrefixNodeTests):
+	cls = OrderedPrefixNode
+
+	def listed(self, prefixes):
+		return sorted(prefixes, key=lambda p: Prefix(p).addr)
+
+class PPrefixNodeTests(PrefixNodeTests):
+	cls = PPrefixNode
+
+	def test_parent(self):
+		t = self.tree('10.1.2.0/24', '10.1.0.0/16')
+		self.assertIsNone(t.parent)
+		self.assertIs(t.find('10.1.0.0/16').parent, t)
+		self.assertIs(t.find('10.1.2.0/24').parent, t.find('10.1.0.0/16'))
+
+	def test_add_foreign_class(self):
+		# a plain PrefixNode has nowhere to keep its parent
+		t = self.tree('10.1.0.0/16')
+		before = shape(t)
+		self.assertRaises(TypeError, t.add, PrefixNode('10.2.0.0/16'))
+		self.assertRaises(TypeError, t.add, PrefixNode('10.0.0.0/12'))
+		self.assertEqual(shape(t), before)
+		self.assertIsNone(t.find('10.2.0.0/16'))
+		self.assertIs(t.lpm('10.2.0.1'), t)
+		self.assertEqual(str(t.prune('10.1.0.0/16')), '10.1.0.0/16')
+
+	def test_adopt_foreign_class(self):
+		# nor can a plain PrefixNode be adopted by a PPrefixNode
+		t = build(PrefixNode, '10.0.0.0/8', '10.1.0.0/16')
+		before = shape(t)
+		self.assertRaises(TypeError, t.add, PPrefixNode('10.0.0.0/12'))
+		n = PPrefixNode('10.0.0.0/12')
+		n.add('10.2.0.0/16')
+		self.assertRaises(TypeError, t.add, n)
+		self.assertEqual(shape(t), before)
+		self.assertFindable(t)
+
+if __name__ == '__main__':
+	unittest.main()
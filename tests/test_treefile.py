@@ -0,0 +1,69 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from ipcidrtree import PrefixNode
+from ipcidrtree.treefile import MappedTree, writeTree, NONE, MAGIC, VERSION, BOM
+
+class TreeFileTests(unittest.TestCase):
+
+	def setUp(self):
+		self.tree = PrefixNode.from_iterable(
+			['10.1.0.0/16', '10.1.2.0/24', '10.2.0.0/16'], root='10.0.0.0/8')
+		(fd, self.path) = tempfile.mkstemp()
+		os.close(fd)
+
+	def tearDown(self):
+		os.unlink(self.path)
+
+	def test_round_trip(self):
+		payloads = dict((str(n), i) for (i, (n, d)) in enumerate(self.tree.dfi()))
+		writeTree(self.tree, self.path, payload=lambda n: payloads[str(n)])
+		with MappedTree(self.path) as mt:
+			self.assertEqual(len(mt), 4)
+			self.assertEqual(str(mt.lpm('10.1.2.3')), '10.1.2.0/24')
+			self.assertEqual(str(mt.lpm('10.3.0.0')), '10.0.0.0/8')
+			self.assertIsNone(mt.lpm('11.0.0.0'))
+			self.assertRaises(ValueError, mt.lpm, -1)
+			self.assertEqual(str(mt.find('10.2.0.0/16')), '10.2.0.0/16')
+			self.assertEqual(mt.find('10.1.2.0/24').payload, payloads['10.1.2.0/24'])
+
+	def test_payload_range(self):
+		for value in (-1, NONE, 2**40):
+			self.assertRaises(ValueError, writeTree, self.tree, self.path,
+				payload=lambda n: value)
+		writeTree(self.tree, self.path, payload=lambda n: NONE-1)
+		with MappedTree(self.path) as mt:
+			self.assertEqual(mt.root().payload, NONE-1)
+
+	def write(self, data):
+		with open(self.path, 'wb') as fh:
+			fh.write(data)
+
+	def assertBadFile(self, message):
+		with self.assertRaises(ValueError) as cm:
+			MappedTree(self.path)
+		self.assertIn(message, str(cm.exception))
+
+	def test_bad_magic(self):
+		self.write(b'\x5a' * 40)
+		self.assertBadFile('not a tree file')
+		self.write(b'\x5a' * 7)
+		self.assertBadFile('not a tree file')
+
+	def test_wrong_version(self):
+		self.write(struct.pack('=5I', MAGIC, VERSION+1, BOM, 0, 0))
+		self.assertBadFile('unsupported tree file version')
+
+	def test_truncated(self):
+		writeTree(self.tree, self.path)
+		with open(self.path, 'rb') as fh:
+			data = fh.read()
+		self.write(data[:-4])
+		self.assertBadFile('is truncated')
+		self.write(data[:40])
+		self.assertBadFile('is truncated')
+
+if __name__ == '__main__':
+	unittest.main()